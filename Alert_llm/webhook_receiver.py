@@ -1,36 +1,43 @@
 from flask import Flask, request, jsonify
-import requests
 import json
+import sys
 from datetime import datetime
+from pathlib import Path
+
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.ollama_client import SyncOllamaClient, OllamaError
+from ai_core.prompt_budget import Section, assemble, budget_for
 
 app = Flask(__name__)
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_MODELS = ["llama3"]  # Add more models for multi-model reasoning
 ALERT_LOG_FILE = "alert_log.json"
 
+# Keep-alive connection pool shared by every alert
+ollama = SyncOllamaClient(base_url=OLLAMA_BASE_URL, timeout=60)
+
 
 def get_ollama_response(alert_summary, model):
-    prompt = (
-        "You are an expert SRE. Given this alert, provide a structured response in JSON with these fields:\n"
-        "1. troubleshooting_steps: List of immediate troubleshooting steps\n"
-        "2. possible_root_causes: List of possible root causes\n"
-        "3. recommended_actions: List of next actions\n"
-        f"\nAlert details:\n{alert_summary}\n"
-        "Respond ONLY with a valid JSON object."
-    )
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
+    # Large alert payloads are cut middle-out so prompt evaluation stays fast
+    prompt = assemble([
+        Section("instructions", (
+            "You are an expert SRE. Given this alert, provide a structured response in JSON with these fields:\n"
+            "1. troubleshooting_steps: List of immediate troubleshooting steps\n"
+            "2. possible_root_causes: List of possible root causes\n"
+            "3. recommended_actions: List of next actions\n"
+            "\nAlert details:\n"
+        ), priority=0),
+        Section("alert", alert_summary, priority=1),
+        Section("format", "\nRespond ONLY with a valid JSON object.", priority=0),
+    ], budget_for(model))
+    print(f"📏 Prompt: {prompt.tokens}/{prompt.budget} tokens" + (" (alert truncated)" if prompt.truncated else ""))
     try:
-        response = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("response", "[No response from LLM]")
-        else:
-            return f"[Ollama error: {response.status_code} {response.text}]"
+        result = ollama.generate(model=model, prompt=prompt.text)
+        return result.get("response", "[No response from LLM]")
+    except OllamaError as e:
+        return f"[Ollama error: {e}]"
     except Exception as e:
         return f"[Ollama exception: {e}]"
 
@@ -1,6 +1,19 @@
+import locale
 import os
+import sys
+from pathlib import Path
 from fastmcp import FastMCP
 
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.file_cache import FileContentCache
+
+# Decoded contents of recently read files, re-read when a file changes
+file_cache = FileContentCache(
+    max_bytes=int(os.environ.get("AI_FILE_CACHE_BYTES", 64 * 1024 * 1024)),
+    max_file_bytes=int(os.environ.get("AI_FILE_CACHE_MAX_FILE_BYTES", 4 * 1024 * 1024))
+)
+
 # 1. Define the tool function with a CLEAR docstring.
 def read_local_file(filepath: str) -> str:
     """
@@ -10,9 +23,9 @@ def read_local_file(filepath: str) -> str:
     try:
         # Security Note: In a real app, you must sanitize and restrict file paths!
         # For this simple example, we use the raw path.
-        with open(filepath, 'r') as f:
-            content = f.read()
-        return content
+        # Repeat reads of an unchanged file are served from memory.
+        # Decode with the locale default, as open() without an encoding does.
+        return file_cache.read(filepath, locale.getpreferredencoding(False))
     except FileNotFoundError:
         return f"Error: File not found at path: {filepath}"
     except Exception as e:
@@ -1,30 +1,367 @@
 # AIService.py
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import requests
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Make the shared ai_core modules importable when run from inside ai_core/
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.backend_pool import BackendPool
+from ai_core.cancellation import RequestCancelled, cancellations, record_cancelled, run_cancellable
+from ai_core.metrics import MetricsMiddleware, record_generation, record_generation_error
+from ai_core.model_warmer import ModelWarmer, parse_keep_alive_map
+from ai_core.ollama_client import OllamaError
+from ai_core.prompt_budget import AssembledPrompt, Section, assemble, budget_for
+from ai_core.response_cache import ResponseCache, make_cache_key
+from ai_core.scheduler import ModelScheduler, SchedulerBusy, PRIORITY_BATCH, PRIORITY_INTERACTIVE, parse_model_limits
+from ai_core.semantic_cache import SemanticCache
+from ai_core.session_store import SessionStore
+from ai_core.singleflight import SingleFlight
+from ai_core.traffic_capture import CaptureMiddleware, redact_fields
+
+# Shared, connection-pooled Ollama backends for all requests
+# Set OLLAMA_BACKENDS="http://host1:11434,http://host2:11434" to spread load
+ollama = BackendPool.from_env()
+
+MODEL = "llama3.2:latest"
+MAX_BATCH_ITEMS = 1000
+# Seconds an /ask may take, queueing included, before its generation is cancelled
+REQUEST_DEADLINE = float(os.environ.get("AI_REQUEST_DEADLINE", 300))
+
+# Exact-match answer cache - set AI_CACHE_PATH to keep answers across restarts
+cache = ResponseCache(
+    max_entries=int(os.environ.get("AI_CACHE_MAX_ENTRIES", 1024)),
+    ttl=float(os.environ.get("AI_CACHE_TTL", 3600)),
+    disk_path=os.environ.get("AI_CACHE_PATH"),
+)
+
+# Keep models resident - AI_PRELOAD_MODELS="llama3.2:latest=30m,llama3=10m"
+warmer = ModelWarmer(
+    ollama,
+    parse_keep_alive_map(os.environ.get("AI_PRELOAD_MODELS", "llama3.2:latest")),
+    rewarm_interval=float(os.environ.get("AI_REWARM_INTERVAL", 600)),
+)
+
+# Identical concurrent questions share one Ollama generation
+inflight = SingleFlight()
+
+# Per-model concurrency limits with a bounded priority wait queue
+scheduler = ModelScheduler(
+    default_concurrency=int(os.environ.get("AI_MAX_CONCURRENCY", 2)),
+    model_limits=parse_model_limits(os.environ.get("AI_MODEL_CONCURRENCY")),
+    max_queue=int(os.environ.get("AI_MAX_QUEUE", 64)),
+    queue_timeout=float(os.environ.get("AI_QUEUE_TIMEOUT", 30)),
+)
+
+# Multi-turn conversations keep Ollama's context server side
+sessions = SessionStore(
+    max_sessions=int(os.environ.get("AI_SESSION_MAX", 1000)),
+    ttl=float(os.environ.get("AI_SESSION_TTL", 1800)),
+    max_bytes=int(os.environ.get("AI_SESSION_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+# Optional paraphrase cache - enable with AI_SEMANTIC_CACHE=1
+semantic_cache = None
+if os.environ.get("AI_SEMANTIC_CACHE") == "1":
+    semantic_cache = SemanticCache(
+        ollama,
+        embed_model=os.environ.get("AI_EMBED_MODEL", "nomic-embed-text"),
+        threshold=float(os.environ.get("AI_SEMANTIC_THRESHOLD", 0.92)),
+        max_entries=int(os.environ.get("AI_SEMANTIC_MAX_ENTRIES", 500)),
+        ttl=float(os.environ.get("AI_SEMANTIC_TTL", 3600)),
+    )
 
 # Define the structure of incoming request data
 class UserPrompt(BaseModel):
     message: str
+    use_cache: bool = True  # False skips the cache lookup and refreshes the entry
+    session: bool = False             # True starts a conversation and returns its session_id
+    session_id: Optional[str] = None  # Continue a conversation from an earlier response
+
+class BatchItem(BaseModel):
+    message: str
+    model: Optional[str] = None     # Defaults to MODEL
+    options: Optional[dict] = None  # Ollama generation options, e.g. {"temperature": 0}
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., max_length=MAX_BATCH_ITEMS)
+    max_concurrency: int = Field(4, ge=1, le=32)
+    stream: bool = False            # True returns NDJSON lines as items finish
+    use_cache: bool = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ollama.start()
+    await warmer.start()
+    yield
+    await warmer.stop()
+    await ollama.aclose()
+    cache.close()
+
+app = FastAPI(title="Local AI API", description="Ask your local Ollama model questions via FastAPI", lifespan=lifespan)
+
+# Request latency, in-flight and error metrics, served at GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in traffic capture for replay - AI_CAPTURE_PATH=capture.jsonl.gz,
+# AI_CAPTURE_REDACT="message,filepath" masks those query, JSON and form fields
+if os.environ.get("AI_CAPTURE_PATH"):
+    app.add_middleware(CaptureMiddleware, path=os.environ["AI_CAPTURE_PATH"],
+                       redact=redact_fields(os.environ.get("AI_CAPTURE_REDACT")))
+
+def build_prompt(message: str, follow_up: bool = False, model: str = MODEL) -> AssembledPrompt:
+    """Wrap the user's message in the assistant prompt template
+
+    An oversized message is cut middle-out to the model's prompt token
+    budget (AI_PROMPT_BUDGETS). Follow-ups in a session omit the preamble,
+    which is already in the context.
+    """
+    preamble = "\nUser: " if follow_up else "You are a helpful assistant.\nUser: "
+    return assemble([
+        Section("preamble", preamble, priority=0),
+        Section("message", message, priority=1),
+        Section("suffix", "\nAssistant:", priority=0),
+    ], budget_for(model))
+
+async def generate(model: str, prompt: str, options: Optional[dict] = None,
+                   priority: int = PRIORITY_INTERACTIVE, context: Optional[List[int]] = None) -> dict:
+    """Run one generation once the scheduler admits it"""
+    async with scheduler.slot(model, priority):
+        started = time.perf_counter()
+        try:
+            result = await ollama.generate(model=model, prompt=prompt, options=options,
+                                           keep_alive=warmer.keep_alive_for(model), context=context)
+        except OllamaError:
+            record_generation_error(model)
+            raise
+    record_generation(model, result, time.perf_counter() - started)
+    warmer.record(result)
+    return result
+
+async def answer_message(message: str, model: str = MODEL, options: Optional[dict] = None,
+                         use_cache: bool = True, priority: int = PRIORITY_INTERACTIVE) -> dict:
+    """Answer one message through the caches, coalescing and the scheduler"""
+    prompt = build_prompt(message, model=model)
+    key = make_cache_key(model, prompt.text, options)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    embedding = None
+    if semantic_cache is not None and use_cache and not options:
+        similar, embedding = await semantic_cache.lookup(model, message)
+        if similar is not None:
+            cache.set(key, similar)
+            return similar
+
+    result = await inflight.do(key, lambda: generate(model, prompt.text, options, priority))
+
+    answer = {"response": result["response"], "prompt_tokens": prompt.tokens, "prompt_truncated": prompt.truncated}
+    cache.set(key, answer)
+    if semantic_cache is not None:
+        semantic_cache.store(model, answer, embedding)
+    return answer
 
-app = FastAPI(title="Local AI API", description="Ask your local Ollama model questions via FastAPI")
+async def answer_in_session(message: str, session_id: Optional[str], model: str = MODEL) -> dict:
+    """Answer the next turn of a conversation, continuing from its stored context
+
+    Session turns depend on the conversation so far and bypass the caches.
+    """
+    session = sessions.open(session_id, model)
+    async with session.lock:
+        context = session.context
+        prompt = build_prompt(message, follow_up=context is not None, model=model)
+        result = await generate(model, prompt.text, context=context)
+        sessions.save(session, result.get("context"))
+    return {"response": result["response"], "session_id": session.id, "turn": session.turns,
+            "prompt_tokens": prompt.tokens, "prompt_truncated": prompt.truncated}
 
 @app.post("/ask")
-def ask_ollama(prompt: UserPrompt):
-    """Send user prompt to local Ollama model and return AI response"""
-    payload = {
-        "model": "llama3.2:latest",
-        "prompt": f"You are a helpful assistant.\nUser: {prompt.message}\nAssistant:",
-        "stream": False
-    }
+async def ask_ollama(prompt: UserPrompt, request: Request):
+    """Send user prompt to local Ollama model and return AI response
+
+    With "session": true, or a "session_id" from an earlier answer, the
+    conversation continues server side and the answer carries the
+    session_id to send with the next turn. An expired session_id starts a
+    new conversation under a new ID.
 
+    If the client disconnects, or AI_REQUEST_DEADLINE passes, the
+    generation is cancelled and its scheduler slot freed.
+    """
     try:
-        response = requests.post("http://localhost:11434/api/generate", json=payload)
-        response.raise_for_status()
-        return {"response": response.json()["response"]}
+        if prompt.session or prompt.session_id:
+            work = answer_in_session(prompt.message, prompt.session_id)
+        else:
+            work = answer_message(prompt.message, use_cache=prompt.use_cache)
+        return await run_cancellable(request, work, REQUEST_DEADLINE)
+    except SchedulerBusy as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    except RequestCancelled as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ask/batch")
+async def ask_ollama_batch(batch: BatchRequest, request: Request):
+    """Answer many prompts with bounded concurrency
+
+    Returns {"results": [...]} in request order, one entry per item with
+    index, model, success, response or error, and elapsed_ms. With
+    "stream": true the entries are sent as NDJSON lines as soon as each
+    item finishes (so in completion order), without buffering the batch.
+    """
+    async def run_item(index: int, item: BatchItem) -> dict:
+        model = item.model or MODEL
+        started = time.perf_counter()
+        entry = {"index": index, "model": model}
+        try:
+            answer = await answer_message(item.message, model, item.options,
+                                          use_cache=batch.use_cache, priority=PRIORITY_BATCH)
+            entry.update(success=True, response=answer["response"])
+        except Exception as e:
+            entry.update(success=False, error=str(e))
+        entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return entry
+
+    async def run_all(emit) -> None:
+        # A fixed set of workers pulls items, so at most max_concurrency are in flight
+        pending = iter(enumerate(batch.items))
+
+        async def worker():
+            for index, item in pending:
+                await emit(await run_item(index, item))
+
+        await asyncio.gather(*(worker() for _ in range(min(batch.max_concurrency, len(batch.items)))))
+
+    if not batch.stream:
+        results = [None] * len(batch.items)
+
+        async def store(entry):
+            results[entry["index"]] = entry
+
+        try:
+            # No deadline for a whole batch, but stop if the client goes away
+            await run_cancellable(request, run_all(store), deadline=None)
+        except RequestCancelled as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        return {"results": results}
+
+    async def result_stream():
+        finished = asyncio.Queue()
+        runner = asyncio.create_task(run_all(finished.put))
+        runner.add_done_callback(lambda _: finished.put_nowait(None))
+        try:
+            while (entry := await finished.get()) is not None:
+                yield json.dumps(entry) + "\n"
+        except asyncio.CancelledError:
+            record_cancelled("disconnect")
+            raise
+        finally:
+            runner.cancel()
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+@app.post("/ask/stream")
+async def ask_ollama_stream(prompt: UserPrompt):
+    """Stream the AI response token by token as NDJSON
+
+    Each line is {"token": "..."}; the last line is {"done": true, ...} with
+    time-to-first-token and total time in milliseconds, or {"error": "..."}
+    if generation failed part-way through.
+    """
+    rendered = build_prompt(prompt.message)
+    started = time.perf_counter()
+    try:
+        slot = await scheduler.acquire(MODEL, PRIORITY_INTERACTIVE)
+    except SchedulerBusy as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+
+    async def token_stream():
+        first_token_ms = None
+        try:
+            async for chunk in ollama.stream_generate(model=MODEL, prompt=rendered.text,
+                                                      keep_alive=warmer.keep_alive_for(MODEL)):
+                if "error" in chunk:
+                    raise OllamaError(chunk["error"])
+                token = chunk.get("response", "")
+                if token:
+                    if first_token_ms is None:
+                        first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+                    yield json.dumps({"token": token}) + "\n"
+                if chunk.get("done"):
+                    record_generation(MODEL, chunk, time.perf_counter() - started)
+                    warmer.record(chunk)
+                    break
+        except asyncio.CancelledError:
+            # The client went away; closing the stream stops Ollama generating
+            record_cancelled("disconnect")
+            raise
+        except Exception as e:
+            record_generation_error(MODEL)
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        finally:
+            slot.release()
+        yield json.dumps({
+            "done": True,
+            "time_to_first_token_ms": first_token_ms,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "prompt_tokens": rendered.tokens,
+            "prompt_truncated": rendered.truncated
+        }) + "\n"
+
+    # The background task frees the slot even if the stream never starts
+    return StreamingResponse(token_stream(), media_type="application/x-ndjson",
+                             background=BackgroundTask(slot.release))
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report response cache hits, misses and size"""
+    stats = cache.stats()
+    stats["coalescing"] = inflight.stats()
+    if semantic_cache is not None:
+        stats["semantic"] = semantic_cache.stats()
+    return stats
+
+@app.get("/sessions/stats")
+async def session_stats():
+    """Report live conversation sessions and the memory their contexts hold"""
+    return sessions.stats()
+
+@app.delete("/sessions/{session_id}")
+async def end_session(session_id: str):
+    """Forget a conversation"""
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"deleted": session_id}
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Report running, queued and rejected generations per model, and cancellations"""
+    stats = scheduler.stats()
+    stats["cancelled"] = dict(cancellations, abandoned_shared_calls=inflight.abandoned)
+    return stats
+
+@app.get("/models/warm")
+async def warm_stats():
+    """Report preloaded models, cold-load counts and recent load events"""
+    return warmer.stats()
+
+@app.get("/backends")
+async def backend_stats():
+    """Report health, model inventory and load of each Ollama backend"""
+    return ollama.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
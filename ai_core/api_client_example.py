@@ -7,14 +7,36 @@ def ask_ai(question):
     except:
         return "Error: Cannot connect to AI service"
 
+def ask_ai_batch(questions):
+    """Ask many questions in one request; answers come back in the same order"""
+    try:
+        response = requests.post(
+            "http://localhost:8000/ask/batch",
+            json={"items": [{"message": q} for q in questions], "max_concurrency": 4}
+        )
+        return [r["response"] if r["success"] else f"Error: {r['error']}" for r in response.json()["results"]]
+    except:
+        return ["Error: Cannot connect to AI service"] * len(questions)
+
+def ask_ai_in_session(question, session_id=None):
+    """Ask a follow-up in a conversation; returns (answer, session_id for the next turn)"""
+    try:
+        payload = {"message": question, "session_id": session_id} if session_id else {"message": question, "session": True}
+        data = requests.post("http://localhost:8000/ask", json=payload).json()
+        return data["response"], data["session_id"]
+    except:
+        return "Error: Cannot connect to AI service", session_id
+
 def chat():
     print("🤖 AI Chat - Type 'quit' to exit")
+    session_id = None  # The server keeps the conversation, so only the new question is sent
     while True:
         question = input("\nYou: ").strip()
         if question.lower() in ['quit', 'exit', 'q']:
             break
         if question:
-            print(f"AI: {ask_ai(question)}")
+            answer, session_id = ask_ai_in_session(question, session_id)
+            print(f"AI: {answer}")
 
 if __name__ == "__main__":
     # Test with example
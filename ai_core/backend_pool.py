@@ -0,0 +1,232 @@
+"""
+Ollama Backend Pool
+Treat several Ollama hosts as one, with health checks and least-loaded routing.
+
+A background task probes every backend's /api/tags (installed models) and
+/api/ps (models loaded in memory). Each generation goes to the healthy
+backend with the fewest outstanding requests among those that have the
+model installed, preferring one that already has it loaded. A backend that
+refuses a connection is ejected at once and the call moves to the next
+one; the probe loop re-admits it when it answers again. Ejected backends
+are only tried when no healthy one is left. Timeouts and error replies do
+not fail over: the backend was working on the request, so running it again
+elsewhere would only repeat it.
+
+BackendPool has the same generate/stream_generate/embed/tags methods as
+OllamaClient, so services can use either.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ai_core.ollama_client import OLLAMA_BASE_URL, OllamaClient, OllamaError
+
+DEFAULT_PROBE_INTERVAL = 10.0    # Seconds between health checks
+
+logger = logging.getLogger(__name__)
+
+
+def model_name(name: str) -> str:
+    """Normalize a model name the way Ollama does ("llama3" -> "llama3:latest")"""
+    return name if ":" in name else f"{name}:latest"
+
+
+class Backend:
+    """One Ollama host and what the pool knows about it"""
+
+    def __init__(self, url: str, client: OllamaClient):
+        self.url = url
+        self.client = client
+        self.healthy = True          # Optimistic until the first probe says otherwise
+        self.installed: set = set()
+        self.loaded: set = set()
+        self.model_sizes: Dict[str, int] = {}
+        self.outstanding = 0
+        self.failures = 0
+        self.last_probe: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def eject(self, error: str) -> None:
+        self.healthy = False
+        self.failures += 1
+        self.last_error = error
+
+
+class BackendPool:
+    """Route Ollama calls across a list of backends"""
+
+    def __init__(self, urls: List[str], probe_interval: float = DEFAULT_PROBE_INTERVAL,
+                 **client_options: Any):
+        self.backends = [Backend(url, OllamaClient(base_url=url, **client_options)) for url in urls]
+        self.probe_interval = probe_interval
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, **client_options: Any) -> "BackendPool":
+        """Build a pool from OLLAMA_BACKENDS (comma separated), else OLLAMA_BASE_URL"""
+        urls = [url.strip() for url in os.environ.get("OLLAMA_BACKENDS", "").split(",") if url.strip()]
+        return cls(
+            urls or [OLLAMA_BASE_URL],
+            probe_interval=float(os.environ.get("OLLAMA_PROBE_INTERVAL", DEFAULT_PROBE_INTERVAL)),
+            **client_options,
+        )
+
+    async def start(self) -> None:
+        """Probe every backend once, then keep probing in the background"""
+        await self.probe_all()
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.probe_all()
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._probe(backend) for backend in self.backends))
+
+    async def _probe(self, backend: Backend) -> None:
+        """Refresh a backend's health and model inventory"""
+        try:
+            tags, ps = await asyncio.gather(backend.client.tags(), backend.client.ps())
+            model_sizes = {model["name"]: model.get("size", 0) for model in tags.get("models", [])}
+            loaded = {model_name(model["name"]) for model in ps.get("models", [])}
+        except OllamaError as e:
+            backend.eject(str(e))
+        except Exception as e:
+            # A malformed reply or an unwrapped transport error; must not end the probe loop
+            logger.warning("Probe of %s failed: %r", backend.url, e)
+            backend.eject(f"Probe failed: {e!r}")
+        else:
+            backend.model_sizes = model_sizes
+            backend.installed = {model_name(name) for name in model_sizes}
+            backend.loaded = loaded
+            backend.healthy = True
+            backend.last_success = time.time()
+            backend.last_error = None
+        backend.last_probe = time.time()
+
+    def pick(self, model: Optional[str] = None, exclude: Optional[List[Backend]] = None) -> Backend:
+        """Choose the least-loaded healthy backend that has model"""
+        remaining = [b for b in self.backends if b not in (exclude or [])]
+        # When every backend is ejected, try them anyway rather than wait for a probe
+        candidates = [b for b in remaining if b.healthy] or remaining
+        if model:
+            model = model_name(model)
+            # Before the first probe inventories are empty, so any backend may serve
+            with_model = [b for b in candidates if model in b.installed or not b.installed]
+            candidates = with_model or candidates
+        if not candidates:
+            raise OllamaError("No Ollama backend available")
+        return min(candidates, key=lambda b: (b.outstanding, model not in b.loaded))
+
+    def _next(self, model: Optional[str], tried: List[Backend],
+              last_error: Optional[OllamaError]) -> Backend:
+        """The next backend to try, or the last connect error once none is left"""
+        try:
+            return self.pick(model, exclude=tried)
+        except OllamaError:
+            if last_error is not None:
+                raise last_error
+            raise
+
+    async def _call(self, model: Optional[str], method: str, *args: Any, **kwargs: Any) -> Any:
+        """Run a client call on the best backend, failing over when one cannot be reached"""
+        tried: List[Backend] = []
+        last_error = None
+        while True:
+            backend = self._next(model, tried, last_error)
+            backend.outstanding += 1
+            try:
+                return await getattr(backend.client, method)(*args, **kwargs)
+            except OllamaError as e:
+                if not e.connect_failed:
+                    raise
+                backend.eject(str(e))
+                tried.append(backend)
+                last_error = e
+            finally:
+                backend.outstanding -= 1
+
+    async def generate(self, model: str, prompt: str, **kwargs: Any) -> Dict[str, Any]:
+        return await self._call(model, "generate", model, prompt, **kwargs)
+
+    async def stream_generate(self, model: str, prompt: str, **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+        """Stream from one backend; only failures before the first chunk fail over"""
+        tried: List[Backend] = []
+        last_error = None
+        while True:
+            backend = self._next(model, tried, last_error)
+            backend.outstanding += 1
+            started = False
+            try:
+                async for chunk in backend.client.stream_generate(model, prompt, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except OllamaError as e:
+                if started or not e.connect_failed:
+                    raise
+                backend.eject(str(e))
+                tried.append(backend)
+                last_error = e
+            finally:
+                backend.outstanding -= 1
+
+    async def embed(self, model: str, text: str, **kwargs: Any) -> List[float]:
+        return await self._call(model, "embed", model, text, **kwargs)
+
+    async def tags(self, **kwargs: Any) -> Dict[str, Any]:
+        return await self._call(None, "tags", **kwargs)
+
+    async def ps(self, **kwargs: Any) -> Dict[str, Any]:
+        return await self._call(None, "ps", **kwargs)
+
+    async def aclose(self) -> None:
+        """Stop probing and close every backend's connections"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        for backend in self.backends:
+            await backend.client.aclose()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Reachability and model inventory as of the last probes, without network I/O
+
+        "age_seconds" is the time since the freshest successful probe, or
+        None if no backend has ever answered.
+        """
+        healthy = [b for b in self.backends if b.healthy and b.last_success is not None]
+        models: Dict[str, Dict[str, Any]] = {}
+        for backend in healthy:
+            for name, size in backend.model_sizes.items():
+                entry = models.setdefault(name, {"name": name, "size": size, "loaded": False})
+                entry["loaded"] = entry["loaded"] or model_name(name) in backend.loaded
+        successes = [b.last_success for b in self.backends if b.last_success is not None]
+        return {
+            "reachable": bool(healthy),
+            "models": list(models.values()),
+            "age_seconds": round(time.time() - max(successes), 3) if successes else None,
+            "probe_interval": self.probe_interval,
+            "last_error": next((b.last_error for b in self.backends if b.last_error), None),
+        }
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Health, inventory and load of every backend"""
+        return [
+            {
+                "url": backend.url,
+                "healthy": backend.healthy,
+                "outstanding": backend.outstanding,
+                "models_installed": sorted(backend.installed),
+                "models_loaded": sorted(backend.loaded),
+                "failures": backend.failures,
+                "last_probe": backend.last_probe,
+                "last_error": backend.last_error,
+            }
+            for backend in self.backends
+        ]
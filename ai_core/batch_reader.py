@@ -0,0 +1,191 @@
+"""
+Batch Reader
+Read many files in one request, concurrently, within byte limits.
+
+Every path is checked and stat()ed first, and the byte budget is handed out
+in request order: each file may use up to max_file_bytes, and all of them
+together up to max_total_bytes. A file larger than its share is returned
+truncated at a character boundary, with the cursor /read-file takes to
+continue; files after the budget runs out are reported as skipped. Reading
+is then done on a dedicated thread pool, so a large batch cannot starve
+the default executor other endpoints use, and whole files go through the
+shared FileContentCache.
+
+Results come back one per file as each completes, carrying the index of
+the path in the request, so callers can stream them or reassemble them in
+order. A failure affects only its own entry.
+"""
+
+import asyncio
+import codecs
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_ISREG
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from ai_core.file_cache import FileContentCache
+from ai_core.file_reader import read_byte_range
+
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_FILES = 100
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 8 * 1024 * 1024
+
+
+def check_encoding(encoding: str) -> None:
+    """Raise ValueError unless encoding names a codec Python knows"""
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise ValueError(f"Unknown encoding: {encoding}") from None
+
+
+def failed(index: int, path: str, status: int, error: str) -> Dict[str, Any]:
+    return {"index": index, "filepath": path, "success": False, "status": status, "error": error}
+
+
+class BatchReader:
+    """Concurrent multi-file reads with per-file and total byte caps"""
+
+    def __init__(self, cache: FileContentCache, is_allowed: Callable[[str], bool],
+                 workers: int = DEFAULT_WORKERS, max_files: int = DEFAULT_MAX_FILES,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                 max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES):
+        self.cache = cache
+        self.is_allowed = is_allowed
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-read")
+        self.batches = 0
+        self.files_read = 0
+        self.bytes_read = 0
+        self.truncated = 0
+        self.errors = 0
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _stat(self, index: int, path: str) -> Any:
+        """The file's stat, or a failed entry saying why it cannot be read"""
+        if not self.is_allowed(path):
+            return failed(index, path, 403, "Access denied: File outside allowed directories")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return failed(index, path, 404, f"File not found: {path}")
+        except OSError as e:
+            return failed(index, path, 500, f"Error reading file: {e}")
+        if not S_ISREG(stat.st_mode):
+            return failed(index, path, 400, f"Path is not a file: {path}")
+        return stat
+
+    def _read(self, index: int, path: str, encoding: str, stat: os.stat_result,
+              budget: int) -> Dict[str, Any]:
+        """Read one file, whole if it fits in budget bytes, else its first budget bytes"""
+        page = None
+        try:
+            if stat.st_size <= budget:
+                try:
+                    content = self.cache.read(path, encoding, stat)
+                except UnicodeDecodeError:
+                    content = self.cache.read(path, "latin-1", stat)
+                used = stat.st_size
+            else:
+                try:
+                    page = read_byte_range(path, 0, budget, encoding)
+                except UnicodeDecodeError:
+                    page = read_byte_range(path, 0, budget, "latin-1")
+                content = page.pop("content")
+                used = page["bytes_read"]
+        except (OSError, ValueError) as e:
+            return failed(index, path, 500, f"Error reading file: {e}")
+        return {
+            "index": index,
+            "filepath": path,
+            "success": True,
+            "status": 200,
+            "content": content,
+            "truncated": page is not None,
+            "range": page,
+            "bytes": used,
+            "file_info": {
+                "name": os.path.basename(path),
+                "size": stat.st_size,
+                "extension": os.path.splitext(path)[1],
+                "absolute_path": os.path.realpath(path),
+            },
+        }
+
+    async def read(self, paths: List[str], encoding: str = "utf-8",
+                   max_file_bytes: Optional[int] = None,
+                   max_total_bytes: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one entry per path as its read completes, then a {"done": ...} summary
+
+        Limits passed here can only lower the reader's own. Raises ValueError
+        for more than max_files paths or an unknown encoding.
+        """
+        if len(paths) > self.max_files:
+            raise ValueError(f"At most {self.max_files} files can be read in one request")
+        check_encoding(encoding)
+        started = time.perf_counter()
+        per_file = min(max_file_bytes or self.max_file_bytes, self.max_file_bytes)
+        remaining = min(max_total_bytes or self.max_total_bytes, self.max_total_bytes)
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+
+        stats = await asyncio.gather(*(loop.run_in_executor(self._executor, self._stat, i, path)
+                                       for i, path in enumerate(paths)))
+        pending = []
+        ok = failures = total = 0
+        for index, (path, stat) in enumerate(zip(paths, stats)):
+            if isinstance(stat, dict):
+                failures += 1
+                yield stat
+                continue
+            if remaining <= 0 and stat.st_size > 0:
+                failures += 1
+                yield failed(index, path, 413, "Skipped: the batch's total byte limit was reached")
+                continue
+            # Budget is handed out in request order, before any reads start
+            budget = min(stat.st_size, per_file, remaining)
+            remaining -= budget
+            pending.append(loop.run_in_executor(self._executor, self._read, index, path, encoding, stat, budget))
+
+        try:
+            for next_done in asyncio.as_completed(pending):
+                entry = await next_done
+                if entry["success"]:
+                    ok += 1
+                    total += entry["bytes"]
+                    self.truncated += entry["truncated"]
+                else:
+                    failures += 1
+                yield entry
+        finally:
+            for future in pending:
+                future.cancel()
+
+        self.files_read += ok
+        self.bytes_read += total
+        self.errors += failures
+        yield {"done": {
+            "files": len(paths),
+            "succeeded": ok,
+            "failed": failures,
+            "bytes": total,
+            "took_ms": round((time.perf_counter() - started) * 1000, 1),
+        }}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "files_read": self.files_read,
+            "bytes_read": self.bytes_read,
+            "truncated": self.truncated,
+            "errors": self.errors,
+            "max_files": self.max_files,
+            "max_file_bytes": self.max_file_bytes,
+            "max_total_bytes": self.max_total_bytes,
+        }
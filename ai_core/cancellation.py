@@ -0,0 +1,75 @@
+"""
+Request Cancellation
+Stop upstream work when the client hangs up or the request runs out of time.
+
+A handler that awaits a generation directly keeps waiting after its client
+disconnects, and Ollama keeps generating tokens nobody will read.
+run_cancellable() runs the work as a task next to a watcher on the ASGI
+receive channel. If the client disconnects, or the deadline passes first,
+the work is cancelled: the pending httpx request is closed (which makes
+Ollama stop generating) and the scheduler slot is released by the normal
+cleanup path. Cancellations are counted per reason for /scheduler/stats
+and /metrics.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+
+from fastapi import Request
+
+from ai_core.metrics import REQUESTS_CANCELLED
+
+DEFAULT_DEADLINE = 300.0    # Seconds a request may take, queueing included
+
+# Reason -> count, for /scheduler/stats
+cancellations: Dict[str, int] = {"disconnect": 0, "deadline": 0}
+
+
+class RequestCancelled(Exception):
+    """Raised when work was abandoned because of a disconnect or deadline"""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+        # 499 is the conventional "client closed request"; nobody reads it
+        self.status_code = 499 if reason == "disconnect" else 504
+
+
+def record_cancelled(reason: str) -> None:
+    cancellations[reason] = cancellations.get(reason, 0) + 1
+    REQUESTS_CANCELLED.inc(reason)
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Return once the client has gone away
+
+    Only safe after the request body has been read, as it consumes receive().
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_cancellable(request: Request, work: Awaitable[Any],
+                          deadline: Optional[float] = DEFAULT_DEADLINE) -> Any:
+    """Await work, cancelling it if the client disconnects or deadline seconds pass"""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, timeout=deadline,
+                                     return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if task in done:
+        return task.result()
+
+    task.cancel()
+    reason = "disconnect" if watcher in done else "deadline"
+    record_cancelled(reason)
+    if reason == "disconnect":
+        raise RequestCancelled("Client disconnected", reason)
+    raise RequestCancelled(f"Request exceeded its {deadline:g}s deadline", reason)
@@ -0,0 +1,632 @@
+"""
+Directory Index
+An in-memory, self-updating index of the files under a set of root directories.
+
+The trees are walked once with os.scandir. After that the index is kept
+current by change notifications: inotify on Linux (through ctypes, no extra
+package), watchdog elsewhere if it is installed, or else polling of
+directory mtimes. Changes are batched and only the directories that changed
+are rescanned, at most MAX_CHANGE_LATENCY after the first one even if
+events never stop (a log being appended to). A full rescan runs every
+full_rescan_interval as a safety net for missed events.
+
+A write to a file (inotify IN_MODIFY and friends) updates that one entry
+in place rather than rescanning its directory.
+
+Listings are served from presorted, cached views with keyset cursors: a
+cursor holds the sort key of the last file returned, so the next page
+starts at a binary search rather than an offset and stays correct while
+files come and go. Each directory records when its membership and its
+files' sizes or times last changed, for itself and for its whole subtree,
+so a change invalidates only the views that include it; a name-sorted
+view even survives writes to the files it lists. Filtered views are
+cached the same way, so total and next_cursor describe the filtered
+listing.
+"""
+
+import base64
+import bisect
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from stat import S_ISREG
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional - inotify or polling is used instead
+    Observer = None
+
+DEFAULT_POLL_INTERVAL = 2.0          # Seconds between directory mtime checks (polling mode)
+DEFAULT_FULL_RESCAN_INTERVAL = 300.0
+CHANGE_SETTLE_SECONDS = 0.1          # Wait for a burst of events to finish before rescanning
+MAX_CHANGE_LATENCY = 1.0             # ...but never longer than this after the first change
+EXCLUDED_DIRS = {".git", "__pycache__", "node_modules", ".venv", ".AIvenv", ".mypy_cache", ".pytest_cache"}
+SORT_KEYS = ("name", "size", "modified")
+MAX_CACHED_VIEWS = 256
+
+# inotify(7) constants
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_ONLYDIR = 0x400, 0x800, 0x4000, 0x01000000
+IN_ISDIR = 0x40000000
+ENTRY_EVENTS = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE    # Change a file, not the directory's membership
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+logger = logging.getLogger(__name__)
+
+
+class FileEntry:
+    """What a listing reports about one file"""
+
+    __slots__ = ("name", "path", "size", "modified", "extension")
+
+    def __init__(self, name: str, path: str, size: int, modified: float):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.modified = modified
+        self.extension = os.path.splitext(name)[1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "path": self.path, "size": self.size,
+                "extension": self.extension, "modified": self.modified}
+
+
+def sort_key(entry: FileEntry, sort: str) -> tuple:
+    # The path breaks ties so every key is unique and cursors are exact
+    if sort == "name":
+        return (entry.name.lower(), entry.path)
+    return (getattr(entry, sort), entry.path)
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed cursor")
+
+
+def scan_directory(path: str) -> Tuple[Dict[str, FileEntry], List[str]]:
+    """Files in one directory, and its subdirectories (not following symlinks)"""
+    files, subdirs = {}, []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in EXCLUDED_DIRS:
+                        subdirs.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = FileEntry(entry.name, entry.path, stat.st_size, stat.st_mtime)
+            except OSError:
+                continue    # Vanished or unreadable while scanning
+    return files, subdirs
+
+
+def sorted_view(entries: Iterable[FileEntry], sort: str) -> Tuple[List[tuple], List[FileEntry]]:
+    """Entries in sort order, with their keys in a parallel list for bisecting"""
+    pairs = sorted(((sort_key(entry, sort), entry) for entry in entries), key=lambda pair: pair[0])
+    return [pair[0] for pair in pairs], [pair[1] for pair in pairs]
+
+
+def filter_view(keys: List[tuple], entries: List[FileEntry],
+                extensions: Optional[Set[str]] = None, min_size: Optional[int] = None,
+                max_size: Optional[int] = None,
+                allowed: Optional[Callable[[str], bool]] = None) -> Tuple[List[tuple], List[FileEntry]]:
+    """The part of a sorted view that passes the filters, still sorted
+
+    extensions are lower-case with the leading dot; allowed, if given, is
+    asked about each path (e.g. PathPolicy.is_allowed).
+    """
+    if not extensions and min_size is None and max_size is None and allowed is None:
+        return keys, entries
+    kept = [i for i, entry in enumerate(entries)
+            if (not extensions or entry.extension.lower() in extensions)
+            and (min_size is None or entry.size >= min_size)
+            and (max_size is None or entry.size <= max_size)
+            and (allowed is None or allowed(entry.path))]
+    return [keys[i] for i in kept], [entries[i] for i in kept]
+
+
+def paginate(keys: List[tuple], entries: List[FileEntry], descending: bool = False,
+             limit: int = 200, cursor: Optional[str] = None, **filters: Any) -> Dict[str, Any]:
+    """One page of a sorted view, starting after cursor
+
+    filters are those of filter_view; total counts every entry that passes
+    them. Raises ValueError for a malformed cursor or one issued for a
+    different sort.
+    """
+    keys, entries = filter_view(keys, entries, **filters)
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        if descending:
+            end = bisect.bisect_left(keys, after) if after is not None else len(entries)
+            start = max(end - limit, 0)
+            page, last, more = entries[start:end][::-1], start, start > 0
+        else:
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+            end = min(start + limit, len(entries))
+            page, last, more = entries[start:end], end - 1, end < len(entries)
+    except TypeError:
+        raise ValueError("Cursor does not match the requested sort")
+    return {
+        "files": [entry.to_dict() for entry in page],
+        "total": len(entries),
+        "next_cursor": encode_cursor(keys[last]) if more and page else None,
+    }
+
+
+def list_directory(directory: str, recursive: bool = False, sort: str = "name",
+                   descending: bool = False, limit: int = 200, cursor: Optional[str] = None,
+                   **filters: Any) -> Dict[str, Any]:
+    """Same as DirectoryIndex.list, but scanning the disk on every call
+
+    Used for directories outside the indexed roots and while the index is
+    still being built.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+    files, subdirs = scan_directory(directory)
+    entries = list(files.values())
+    pending = subdirs if recursive else []
+    while pending:
+        try:
+            files, subdirs = scan_directory(pending.pop())
+        except OSError:
+            continue    # Unreadable subdirectory
+        entries.extend(files.values())
+        pending.extend(subdirs)
+    keys, entries = sorted_view(entries, sort)
+    return paginate(keys, entries, descending, limit, cursor, **filters)
+
+
+class _Inotify:
+    """Minimal inotify binding: directory watches and batched event reads"""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def remove(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        """(watch descriptor, mask, file name) of each pending event, waiting up to timeout"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            start = offset + EVENT_HEADER.size
+            name = os.fsdecode(data[start:start + length].rstrip(b"\0"))
+            events.append((wd, mask, name))
+            offset = start + length
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DirectoryIndex:
+    """Files under roots, kept current in the background"""
+
+    def __init__(self, roots: Iterable[str], poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 full_rescan_interval: float = DEFAULT_FULL_RESCAN_INTERVAL):
+        self.roots = [os.path.realpath(root) for root in roots if os.path.isdir(root)]
+        self.poll_interval = poll_interval
+        self.full_rescan_interval = full_rescan_interval
+        self.mode = "stopped"
+        self.ready = False
+        self.version = 0
+        self.rescans = 0
+        self.watch_errors = 0
+        self.listener_errors = 0
+        self.built_seconds: Optional[float] = None
+        self._files: Dict[str, Dict[str, FileEntry]] = {}     # directory -> name -> entry
+        self._subdirs: Dict[str, Set[str]] = {}
+        self._dir_mtimes: Dict[str, int] = {}
+        # directory -> [membership, attributes]: self.version at the last change of
+        # each kind, to the directory itself (_own) or anywhere below it (_tree)
+        self._own: Dict[str, List[int]] = {}
+        self._tree: Dict[str, List[int]] = {}
+        self._views: Dict[tuple, Tuple[int, Tuple[List[tuple], List[FileEntry]]]] = {}
+        self._dirty: Set[str] = set()
+        self._dirty_files: Set[Tuple[str, str]] = set()    # (directory, name) written to
+        self._dirty_since: Optional[float] = None    # When the oldest unscanned change came in
+        self._settling = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[str, int] = {}
+        self._watched_dirs: Dict[int, str] = {}
+        self._observer = None
+        self._listeners: List[Callable[[str, Optional[Dict[str, FileEntry]]], None]] = []
+
+    def add_listener(self, callback: Callable[[str, Optional[Dict[str, FileEntry]]], None]) -> None:
+        """Call callback(directory, files) after each directory is (re)scanned
+
+        files is None when the directory was removed. Called on the index
+        thread, so callbacks should only hand the change off.
+        """
+        self._listeners.append(callback)
+
+    # -- lifecycle --
+
+    def start(self) -> None:
+        """Build the index and start watching, both in the background"""
+        thread = threading.Thread(target=self._run, name="dir-index", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self.mode = "stopped"
+
+    def _run(self) -> None:
+        self._choose_watcher()
+        started = time.perf_counter()
+        for root in self.roots:
+            self._index_tree(root)
+        self.built_seconds = round(time.perf_counter() - started, 3)
+        self.ready = True
+
+        last_full = last_poll = time.monotonic()
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                self._read_inotify()
+            else:
+                self._stop.wait(CHANGE_SETTLE_SECONDS)
+            now = time.monotonic()
+            if self.mode == "polling" and now - last_poll >= self.poll_interval:
+                self._poll_mtimes()
+                last_poll = now
+            if now - last_full >= self.full_rescan_interval:
+                self._mark_dirty(list(self._files))
+                last_full = now
+            self._rescan_dirty()
+
+    def _choose_watcher(self) -> None:
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self.mode = "inotify"
+                return
+            except (OSError, AttributeError):
+                pass
+        if Observer is not None:
+            index = self
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    paths = [event.src_path, getattr(event, "dest_path", None)]
+                    index._mark_dirty([p if event.is_directory and p in index._files else os.path.dirname(p)
+                                       for p in paths if p])
+
+            self._observer = Observer()
+            for root in self.roots:
+                self._observer.schedule(Handler(), root, recursive=True)
+            self._observer.start()
+            self.mode = "watchdog"
+            return
+        self.mode = "polling"
+
+    # -- keeping the index current --
+
+    def _index_tree(self, root: str) -> None:
+        """Scan root and every directory below it"""
+        pending = [root]
+        while pending and not self._stop.is_set():
+            directory = pending.pop()
+            pending.extend(self._rescan_directory(directory))
+
+    def _rescan_directory(self, directory: str) -> List[str]:
+        """Refresh one directory; returns subdirectories that are new to the index"""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            files, subdirs = scan_directory(directory)
+        except OSError:
+            self._forget_tree(directory)
+            return []
+        new = [subdir for subdir in subdirs if subdir not in self._files]
+        with self._lock:
+            removed = self._subdirs.get(directory, set()) - set(subdirs)
+            old = self._files.get(directory)
+            members = old is None or old.keys() != files.keys()
+            attributes = False
+            for name, entry in files.items():
+                # Keep the entries views already hold, so they see new sizes and times
+                current = (old or {}).get(name)
+                if current is not None:
+                    attributes |= self._update_entry(current, entry.size, entry.modified)
+                    files[name] = current
+            self._files[directory] = files
+            self._subdirs[directory] = set(subdirs)
+            self._dir_mtimes[directory] = mtime
+            if members or attributes:
+                self._touch(directory, members)
+        for subdir in removed:
+            self._forget_tree(subdir)
+        self._watch(directory)
+        self.rescans += 1
+        self._notify(directory, files)
+        return new
+
+    def _forget_tree(self, directory: str) -> None:
+        with self._lock:
+            prefix = directory + os.sep
+            gone = [d for d in self._files if d == directory or d.startswith(prefix)]
+            for d in gone:
+                self._files.pop(d, None)
+                self._subdirs.pop(d, None)
+                self._dir_mtimes.pop(d, None)
+                self._own.pop(d, None)
+                self._tree.pop(d, None)
+            if gone:
+                parent = directory if directory in self.roots else os.path.dirname(directory)
+                self._touch(parent, True, own=False)
+        for d in gone:
+            self._notify(d, None)
+            wd = self._watches.pop(d, None)
+            if wd is not None:
+                self._watched_dirs.pop(wd, None)
+                if self._inotify is not None:
+                    self._inotify.remove(wd)
+
+    @staticmethod
+    def _update_entry(entry: FileEntry, size: int, modified: float) -> bool:
+        """Give entry a new size and time in place; True if either changed"""
+        if (entry.size, entry.modified) == (size, modified):
+            return False
+        entry.size, entry.modified = size, modified
+        return True
+
+    def _touch(self, directory: str, members: bool, own: bool = True) -> None:
+        """Record a change to directory's file list (members) or its files' sizes and times
+
+        Called with the lock held. The change is stamped on directory and on
+        every ancestor up to its root, so recursive views notice it too.
+        """
+        self.version += 1
+        kind = 0 if members else 1
+        if own:
+            self._own.setdefault(directory, [0, 0])[kind] = self.version
+        path = directory
+        while True:
+            self._tree.setdefault(path, [0, 0])[kind] = self.version
+            parent = os.path.dirname(path)
+            if path in self.roots or parent == path:
+                break
+            path = parent
+
+    def _refresh_entry(self, directory: str, name: str) -> bool:
+        """Update one written file in place; False if its directory needs a rescan instead"""
+        entry = self._files.get(directory, {}).get(name)
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            return False
+        if not S_ISREG(stat.st_mode):
+            return False
+        with self._lock:
+            if self._update_entry(entry, stat.st_size, stat.st_mtime):
+                self._touch(directory, False)
+        return True
+
+    def _notify(self, directory: str, files: Optional[Dict[str, FileEntry]]) -> None:
+        """Run the listeners; one failing must not stop the index thread"""
+        for callback in self._listeners:
+            try:
+                callback(directory, files)
+            except Exception:
+                self.listener_errors += 1
+                logger.exception("Directory index listener failed for %s", directory)
+
+    def _watch(self, directory: str) -> None:
+        if self._inotify is None or directory in self._watches:
+            return
+        try:
+            wd = self._inotify.add(directory)
+        except OSError:
+            # Usually fs.inotify.max_user_watches; the periodic full rescan covers it
+            self.watch_errors += 1
+            return
+        self._watches[directory] = wd
+        self._watched_dirs[wd] = directory
+
+    def _read_inotify(self) -> None:
+        timeout = CHANGE_SETTLE_SECONDS if self._dirty else 1.0
+        events = self._inotify.read(timeout)
+        changed, written = [], []
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                changed.extend(self._files)
+            elif wd in self._watched_dirs:
+                directory = self._watched_dirs[wd]
+                if name and not mask & ~ENTRY_EVENTS:    # A write, and not to a subdirectory
+                    written.append((directory, name))
+                else:
+                    changed.append(directory)
+        self._mark_dirty(changed, written)
+        # More events may follow in the same burst; rescan once they settle
+        self._settling = bool(events)
+
+    def _poll_mtimes(self) -> None:
+        changed = []
+        for directory, mtime in list(self._dir_mtimes.items()):
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    changed.append(directory)
+            except OSError:
+                changed.append(directory)
+        self._mark_dirty(changed)
+
+    def _mark_dirty(self, directories: Iterable[str], files: Iterable[Tuple[str, str]] = ()) -> None:
+        with self._lock:
+            self._dirty.update(directories)
+            self._dirty_files.update(files)
+            if (self._dirty or self._dirty_files) and self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+
+    def _rescan_dirty(self) -> None:
+        if self._settling and self._dirty_since is not None \
+                and time.monotonic() - self._dirty_since < MAX_CHANGE_LATENCY:
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            written, self._dirty_files = self._dirty_files, set()
+            self._dirty_since = None
+        updated = set()
+        for directory, name in written:
+            if directory in dirty:
+                continue    # Rescanned below anyway
+            if self._refresh_entry(directory, name):
+                updated.add(directory)
+            else:
+                dirty.add(directory)
+        for directory in updated - dirty:
+            self._notify(directory, self._files.get(directory))
+        for directory in dirty:
+            if os.path.isdir(directory):
+                for subdir in self._rescan_directory(directory):
+                    self._index_tree(subdir)
+            else:
+                self._forget_tree(directory)
+
+    # -- queries --
+
+    def covers(self, directory: str) -> bool:
+        """True if directory is inside an indexed root and the index is built"""
+        directory = os.path.realpath(directory)
+        return self.ready and any(directory == root or directory.startswith(root + os.sep) for root in self.roots)
+
+    def _changed(self, directory: str, recursive: bool, sort: str) -> int:
+        """When directory last changed in a way that matters to a view sorted by sort"""
+        members, attributes = (self._tree if recursive else self._own).get(directory, (0, 0))
+        # A name-sorted view holds the entries themselves, which are updated in place
+        return members if sort == "name" else max(members, attributes)
+
+    @staticmethod
+    def _filter_key(filters: Dict[str, Any]) -> tuple:
+        extensions = filters.get("extensions")
+        return (frozenset(extensions) if extensions else None, filters.get("min_size"),
+                filters.get("max_size"), filters.get("allowed"))
+
+    def _cached(self, cache_key: tuple, changed: int) -> Optional[Tuple[int, Tuple[List[tuple], List[FileEntry]]]]:
+        """(version it was built at, view) if still current"""
+        cached = self._views.get(cache_key)
+        return cached if cached is not None and cached[0] >= changed else None
+
+    def _store(self, cache_key: tuple, version: int, view: Tuple[List[tuple], List[FileEntry]]) -> None:
+        if cache_key not in self._views and len(self._views) >= MAX_CACHED_VIEWS:
+            self._views.pop(next(iter(self._views)), None)
+        self._views[cache_key] = (version, view)
+
+    def has_view(self, directory: str, recursive: bool = False, sort: str = "name",
+                 **filters: Any) -> bool:
+        """True if list() would be served from a cached view, without sorting or filtering"""
+        directory = os.path.realpath(directory)
+        key = (directory, recursive, sort) + self._filter_key(filters)
+        return self._cached(key, self._changed(directory, recursive, sort)) is not None
+
+    def _view(self, directory: str, recursive: bool, sort: str,
+              **filters: Any) -> Tuple[List[tuple], List[FileEntry]]:
+        """Sort keys and entries for a directory, cached until something in it changes
+
+        A filtered view is cached under its filters as well. Policy answers
+        (allowed) are kept as long as the directory is unchanged; a swapped
+        symlink changes its directory, which drops them.
+        """
+        changed = self._changed(directory, recursive, sort)
+        base_key = (directory, recursive, sort, None, None, None, None)
+        filtered_key = base_key[:3] + self._filter_key(filters)
+        cached = self._cached(filtered_key, changed) or self._cached(base_key, changed)
+        if cached is None:
+            with self._lock:
+                version = self.version
+                if recursive:
+                    prefix = directory + os.sep
+                    entries = [entry for d, files in self._files.items()
+                               if d == directory or d.startswith(prefix) for entry in files.values()]
+                else:
+                    entries = list(self._files.get(directory, {}).values())
+            cached = (version, sorted_view(entries, sort))
+            self._store(base_key, *cached)
+        version, view = cached
+        if filtered_key != base_key and self._views.get(filtered_key) is not cached:
+            # Stamped with the base view's version, so it is no fresher than its source
+            view = filter_view(*view, **filters)
+            self._store(filtered_key, version, view)
+        return view
+
+    def files(self, directory: str) -> List[FileEntry]:
+        """Every file below directory, in name order; KeyError if not indexed"""
+        directory = os.path.realpath(directory)
+        if directory not in self._files:
+            raise KeyError(directory)
+        return self._view(directory, True, "name")[1]
+
+    def list(self, directory: str, recursive: bool = False, sort: str = "name",
+             descending: bool = False, limit: int = 200, cursor: Optional[str] = None,
+             **filters: Any) -> Dict[str, Any]:
+        """One page of files in directory, sorted and filtered (see paginate)
+
+        Raises KeyError if directory is not in the index.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        directory = os.path.realpath(directory)
+        if directory not in self._files:
+            raise KeyError(directory)
+        keys, entries = self._view(directory, recursive, sort, **filters)
+        return paginate(keys, entries, descending, limit, cursor)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "ready": self.ready,
+            "roots": self.roots,
+            "directories": len(self._files),
+            "files": sum(len(files) for files in self._files.values()),
+            "build_seconds": self.built_seconds,
+            "rescans": self.rescans,
+            "watches": len(self._watches),
+            "watch_errors": self.watch_errors,
+            "listener_errors": self.listener_errors,
+        }
@@ -1,12 +1,27 @@
 # Import the library that lets us talk to websites/APIs over the internet
 import requests
+import sys
+from pathlib import Path
+
+# Let Python find our shared helpers in the ai_core folder
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.prompt_budget import Section, assemble, budget_for
 
 # Create a function that sends questions to the AI and gets answers back
 def ask_ollama(user_message):
+    # Build the prompt so it fits in the model's context window
+    # (a very long question is trimmed in the middle, keeping its start and end)
+    prompt = assemble([
+        Section("preamble", "You are a helpful assistant. User: ", priority=0),  # Always kept
+        Section("question", user_message, priority=1),  # Trimmed if too long
+        Section("suffix", "\nAssistant:", priority=0),
+    ], budget_for("llama3.2:latest"))
+    print(f"Prompt uses about {prompt.tokens} tokens")  # Longer prompts take longer to read
+
     # Package up our request with all the info the AI needs
     payload = {
         "model": "llama3.2:latest",  # Tell it which AI brain to use
-        "prompt": f"You are a helpful assistant. User: {user_message}\nAssistant:",  # Give the AI context and our question
+        "prompt": prompt.text,  # Give the AI context and our question
         "stream": False  # Get the full answer at once, not word by word
     }
     
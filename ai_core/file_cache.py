@@ -0,0 +1,104 @@
+"""
+File Content Cache
+Keep the decoded text of recently read files in memory, validated by stat.
+
+Entries are keyed on (resolved path, encoding) and carry the file's stat
+signature (mtime, size, inode, device). A lookup stats the file and only
+serves the cached text if the signature still matches, so an edited or
+replaced file is re-read on the next call. Eviction is least recently used
+by total bytes held rather than entry count, and files larger than
+max_file_bytes are read but never cached.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024       # Memory budget for cached text
+DEFAULT_MAX_FILE_BYTES = 4 * 1024 * 1024   # Larger files are never cached
+
+
+def stat_signature(stat: os.stat_result) -> Tuple[int, int, int, int]:
+    """What must be unchanged for a cached copy of a file to still be valid"""
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino, stat.st_dev)
+
+
+class FileContentCache:
+    """Byte-bounded LRU of decoded file contents"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()   # key -> (signature, text, cost)
+        self._lock = threading.Lock()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def read(self, path: str, encoding: str = "utf-8",
+             stat: Optional[os.stat_result] = None) -> str:
+        """Return the file's text, from memory if the file is unchanged
+
+        Pass stat when the caller has already stat()ed the file. Decoding
+        errors propagate as UnicodeDecodeError, as with open().read().
+        """
+        path = os.path.realpath(path)
+        stat = stat or os.stat(path)
+        key = (path, encoding)
+        signature = stat_signature(stat)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        with open(path, "r", encoding=encoding) as f:
+            text = f.read()
+        if stat.st_size <= self.max_file_bytes:
+            self._store(key, signature, text)
+        return text
+
+    def _store(self, key: Tuple[str, str], signature: tuple, text: str) -> None:
+        cost = sys.getsizeof(text)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_held -= old[2]
+            self._entries[key] = (signature, text, cost)
+            self.bytes_held += cost
+            while self.bytes_held > self.max_bytes and self._entries:
+                _, (_, _, evicted_cost) = self._entries.popitem(last=False)
+                self.bytes_held -= evicted_cost
+                self.evictions += 1
+
+    def invalidate(self, path: str) -> None:
+        """Forget every cached decoding of path"""
+        path = os.path.realpath(path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self.bytes_held -= self._entries.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes_held = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio and memory held"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes_held": self.bytes_held,
+            "max_bytes": self.max_bytes,
+            "max_file_bytes": self.max_file_bytes,
+            "evictions": self.evictions,
+        }
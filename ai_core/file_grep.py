@@ -0,0 +1,253 @@
+"""
+File Grep
+Run a regular expression over many files in parallel and stream the matches.
+
+Python's re engine holds the GIL, so threads cannot spread a regex over
+cores; files are handed to a process pool in batches instead. Workers map
+each file into memory and run the pattern over the mapping as bytes, so a
+file is neither read into a Python string nor decoded unless a line
+matches. Binary files (a NUL byte near the start) are skipped.
+
+The caller receives results batch by batch as they complete, with a cap on
+matches and a deadline: once either is hit, batches that have not started
+are cancelled, and running ones stop at their next file. A worker stuck
+inside one file past the deadline (a pathological pattern) is killed and
+the pool restarted, which is why grepping is not done in threads unless
+AI_GREP_WORKERS=0. A pool broken by a dying worker (OOM kill, SIGBUS from
+a file truncated under its mapping) is replaced the same way, and the
+batches it lost are retried a bounded number of times.
+"""
+
+import asyncio
+import concurrent.futures
+import mmap
+import multiprocessing
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+BATCH_FILES = 64              # Files per task sent to a worker
+BATCH_BYTES = 32 * 1024 * 1024
+OVERRUN_GRACE = 1.0           # Seconds past the deadline before stuck workers are killed
+MAX_RESUBMITS = 2             # Times a batch is retried after its pool broke under it
+BINARY_SNIFF_BYTES = 8192
+MAX_LINE_CHARS = 500
+
+Match = Tuple[str, int, str]
+
+
+def compile_pattern(pattern: str, ignore_case: bool = False) -> "re.Pattern[bytes]":
+    """Compile a str pattern for matching against bytes; raises re.error"""
+    return re.compile(pattern.encode("utf-8"), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+
+
+def grep_file(regex: "re.Pattern[bytes]", path: str, limit: int) -> Tuple[List[Match], bool]:
+    """Up to limit matching lines of one file, and whether it was text"""
+    matches: List[Match] = []
+    with open(path, "rb") as f:
+        if b"\0" in f.read(BINARY_SNIFF_BYTES):
+            return matches, False
+        if os.fstat(f.fileno()).st_size == 0:
+            return matches, True
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            line_number, counted_to, position = 1, 0, 0
+            size = len(data)
+            while position < size and len(matches) < limit:
+                found = regex.search(data, position)
+                if found is None:
+                    break
+                line_start = data.rfind(b"\n", 0, found.start()) + 1
+                line_end = data.find(b"\n", found.start())
+                if line_end < 0:
+                    line_end = size
+                line_number += data[counted_to:line_start].count(b"\n")
+                counted_to = line_start
+                text = data[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r")
+                matches.append((path, line_number, text[:MAX_LINE_CHARS]))
+                # One match per line; carry on from the next line
+                position = line_end + 1
+    return matches, True
+
+
+def grep_batch(pattern: bytes, flags: int, paths: List[str], limit: int,
+               deadline: float) -> Dict[str, Any]:
+    """Worker entry point: grep paths until limit matches or the deadline (time.time())"""
+    regex = re.compile(pattern, flags)
+    matches: List[Match] = []
+    scanned = binary = errors = 0
+    for path in paths:
+        if len(matches) >= limit or time.time() >= deadline:
+            break
+        try:
+            found, is_text = grep_file(regex, path, limit - len(matches))
+        except (OSError, ValueError):
+            errors += 1    # Vanished, unreadable, or changed size under the mapping
+            continue
+        scanned += 1
+        binary += not is_text
+        matches.extend(found)
+    return {"matches": matches, "scanned": scanned, "binary": binary, "errors": errors}
+
+
+def make_batches(files: List[Tuple[str, int]]) -> List[List[str]]:
+    """Group (path, size) pairs into tasks of similar cost"""
+    batches, current, current_bytes = [], [], 0
+    for path, size in files:
+        current.append(path)
+        current_bytes += size
+        if len(current) >= BATCH_FILES or current_bytes >= BATCH_BYTES:
+            batches.append(current)
+            current, current_bytes = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+class GrepPool:
+    """A lazily started process pool shared by all grep requests"""
+
+    def __init__(self, workers: Optional[int] = None):
+        # 0 workers: grep in threads only (no child processes)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.searches = 0
+        self.files_scanned = 0
+        self.truncated = {"matches": 0, "deadline": 0}
+        self.restarts = 0
+
+    def _pool(self) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+        if self._executor is not None and getattr(self._executor, "_broken", False):
+            self._restart(self._executor)
+        if self.workers and self._executor is None:
+            # forkserver children start clean rather than copying this process's threads
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._kill(self._executor)
+
+    def _kill(self, executor: concurrent.futures.ProcessPoolExecutor) -> None:
+        """Stop a pool without waiting for running batches; grep work is disposable"""
+        if executor is self._executor:
+            self._executor = None
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _restart(self, executor: concurrent.futures.ProcessPoolExecutor) -> None:
+        """Drop executor so the next _pool() starts a fresh one (once per pool)"""
+        if executor is self._executor:
+            self.restarts += 1
+            self._kill(executor)
+
+    def _submit(self, *args: Any) -> Tuple[asyncio.Future, Optional[Tuple[Any, concurrent.futures.Future]]]:
+        """Start one grep_batch; returns the awaitable and, on a pool, (pool, its future)"""
+        pool = self._pool()
+        if pool is None:
+            return asyncio.ensure_future(asyncio.to_thread(grep_batch, *args)), None
+        try:
+            submitted = pool.submit(grep_batch, *args)
+        except (concurrent.futures.process.BrokenProcessPool, RuntimeError):
+            # Broke (or was shut down) since the check in _pool(); one fresh pool is enough
+            self._restart(pool)
+            pool = self._pool()
+            submitted = pool.submit(grep_batch, *args)
+        return asyncio.wrap_future(submitted), (pool, submitted)
+
+    def _reap(self, executor: concurrent.futures.ProcessPoolExecutor,
+              futures: List[concurrent.futures.Future]) -> None:
+        """Kill the pool if abandoned batches are still running well past their deadline"""
+        if all(future.done() for future in futures):
+            return
+        self._restart(executor)
+
+    async def search(self, regex: "re.Pattern[bytes]", files: List[Tuple[str, int]],
+                     max_matches: int, timeout: float) -> AsyncIterator[Dict[str, Any]]:
+        """Yield {"matches": [...]} per finished batch, then a {"done": ...} summary"""
+        started = time.perf_counter()
+        deadline = time.time() + timeout
+        self.searches += 1
+        loop = asyncio.get_running_loop()
+        batches = make_batches(files)
+        window = max(self.workers, 1) * 2    # Batches in flight; more would only delay cancellation
+
+        found = scanned = binary = errors = 0
+        truncated = None
+        retries = [0] * len(batches)
+        queue = list(range(len(batches)))
+        pending: Dict[asyncio.Future, int] = {}    # -> the batch, to resubmit if its pool breaks
+        running: Dict[asyncio.Future, Tuple[Any, concurrent.futures.Future]] = {}
+        try:
+            while queue or pending:
+                while queue and len(pending) < window and truncated is None:
+                    index = queue.pop(0)
+                    future, on_pool = self._submit(regex.pattern, regex.flags, batches[index],
+                                                   max_matches - found, deadline)
+                    if on_pool is not None:
+                        running[future] = on_pool
+                    pending[future] = index
+                if not pending:
+                    break
+                remaining = deadline - time.time()
+                done, _ = await asyncio.wait(pending, timeout=max(remaining, 0),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    on_pool = running.pop(future, None)
+                    if future.cancelled() or isinstance(future.exception(), concurrent.futures.process.BrokenProcessPool):
+                        # Its pool died (a worker was killed, here or over another request's
+                        # stuck batch): replace the pool and retry, unless this batch keeps doing it
+                        if on_pool is not None:
+                            self._restart(on_pool[0])
+                        if retries[index] < MAX_RESUBMITS:
+                            retries[index] += 1
+                            queue.append(index)
+                        else:
+                            errors += len(batches[index])
+                        continue
+                    result = future.result()
+                    scanned += result["scanned"]
+                    binary += result["binary"]
+                    errors += result["errors"]
+                    matches = result["matches"][:max_matches - found]
+                    found += len(matches)
+                    if matches:
+                        yield {"matches": matches}
+                if found >= max_matches:
+                    truncated = "matches"
+                elif (queue or pending) and time.time() >= deadline:
+                    truncated = "deadline"
+                if truncated is not None:
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+            for pool, submitted in running.values():
+                loop.call_later(max(deadline - time.time(), 0) + OVERRUN_GRACE,
+                                self._reap, pool, [submitted])
+        if truncated is not None:
+            self.truncated[truncated] += 1
+        self.files_scanned += scanned
+        yield {"done": {
+            "matches": found,
+            "files": len(files),
+            "files_scanned": scanned,
+            "binary_skipped": binary,
+            "errors": errors,
+            "truncated": truncated,
+            "took_ms": round((time.perf_counter() - started) * 1000, 1),
+        }}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "started": self._executor is not None,
+            "restarts": self.restarts,
+            "searches": self.searches,
+            "files_scanned": self.files_scanned,
+            "truncated": dict(self.truncated),
+        }
@@ -0,0 +1,187 @@
+"""
+Ranged File Reader
+Read part of a file - a byte range or a range of lines - at constant memory.
+
+Byte ranges are served with seek() + read(). Line ranges are found by
+scanning a memory-mapped view of the file for newlines, so nothing but the
+requested lines is ever copied. Every result carries a continuation cursor
+that records the byte offset where the next page starts; passing it back
+skips the scan entirely, so paging through a large file stays cheap.
+"""
+
+import codecs
+import mmap
+import os
+from typing import Any, Dict, Optional
+
+DEFAULT_RANGE_BYTES = 1024 * 1024          # Bytes returned when no length is given
+MAX_RANGE_BYTES = 8 * 1024 * 1024          # Largest range a single call may return
+DEFAULT_PAGE_LINES = 500                   # Lines returned when no end_line is given
+LINE_COUNT_MAX_BYTES = 4 * 1024 * 1024     # Only count lines in files up to this size
+COUNT_CHUNK = 1024 * 1024
+MAX_CHAR_BYTES = 4                         # Longest encoded character a range may be widened by
+
+
+class RangeError(ValueError):
+    """Raised for a range or cursor that does not fit the file"""
+
+
+def is_ranged(offset: Optional[int] = None, length: Optional[int] = None,
+              start_line: Optional[int] = None, end_line: Optional[int] = None,
+              cursor: Optional[str] = None) -> bool:
+    """True if any range parameter was given"""
+    return any(value is not None for value in (offset, length, start_line, end_line, cursor))
+
+
+def make_cursor(stat: os.stat_result, byte_offset: int, line: Optional[int] = None) -> str:
+    """Encode where the next page starts; tied to the file version it was made for"""
+    return f"{byte_offset}:{line or 0}:{stat.st_mtime_ns:x}"
+
+
+def parse_cursor(cursor: str, stat: os.stat_result) -> Dict[str, Optional[int]]:
+    """Decode a cursor, rejecting one made for a different version of the file"""
+    try:
+        byte_offset, line, version = cursor.split(":")
+        byte_offset, line = int(byte_offset), int(line)
+    except ValueError:
+        raise RangeError("Malformed cursor")
+    if version != f"{stat.st_mtime_ns:x}":
+        raise RangeError("File changed since the cursor was issued; start again without a cursor")
+    return {"offset": byte_offset, "line": line or None}
+
+
+def count_lines(path: str, size: int) -> Optional[int]:
+    """Number of lines in the file, or None if the file is too large to count cheaply"""
+    if size > LINE_COUNT_MAX_BYTES:
+        return None
+    lines, last = 0, b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(COUNT_CHUNK):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    return lines + (last != b"\n")
+
+
+def _decode(data: bytes, encoding: str, final: bool) -> tuple:
+    """Decode data, holding back an incomplete trailing character; return (text, bytes used)"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    text = decoder.decode(data, final=final)
+    pending = decoder.getstate()[0]
+    return text, len(data) - len(pending)
+
+
+def read_byte_range(path: str, offset: int = 0, length: Optional[int] = None,
+                    encoding: str = "utf-8") -> Dict[str, Any]:
+    """Read length bytes from offset, decoded as text
+
+    A character split by the end of the range is left for the next page,
+    so next_offset always points at a character boundary. A range too short
+    to hold even the character at offset is widened to take that one
+    character, so following next_offset always moves forward.
+    """
+    stat = os.stat(path)
+    length = min(length if length is not None else DEFAULT_RANGE_BYTES, MAX_RANGE_BYTES)
+    if offset < 0 or length < 0:
+        raise RangeError("offset and length must not be negative")
+    if offset > stat.st_size:
+        raise RangeError(f"offset {offset} is beyond the end of the file ({stat.st_size} bytes)")
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+        eof = offset + len(data) >= stat.st_size
+        text, used = _decode(data, encoding, final=eof)
+        while used == 0 and not eof and len(data) < length + MAX_CHAR_BYTES:
+            data += f.read(1)
+            eof = offset + len(data) >= stat.st_size
+            text, used = _decode(data, encoding, final=eof)
+    if used == 0 and not eof:
+        raise RangeError(f"No whole character starts at offset {offset}")
+    next_offset = offset + used
+    return {
+        "content": text,
+        "offset": offset,
+        "bytes_read": used,
+        "total_size": stat.st_size,
+        "line_count": count_lines(path, stat.st_size),
+        "eof": eof,
+        "next_offset": None if eof else next_offset,
+        "next_cursor": None if eof else make_cursor(stat, next_offset),
+    }
+
+
+def read_line_range(path: str, start_line: int = 1, end_line: Optional[int] = None,
+                    encoding: str = "utf-8", cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Read lines start_line..end_line (1-based, inclusive)
+
+    With a cursor from a previous call the scan starts at the cursor's byte
+    offset instead of the top of the file. A page also stops early once it
+    reaches MAX_RANGE_BYTES, in the middle of a line if that line alone is
+    longer; next_cursor then continues where it stopped.
+    """
+    stat = os.stat(path)
+    line, position = 1, 0
+    if cursor:
+        resume = parse_cursor(cursor, stat)
+        if resume["line"] is None:
+            raise RangeError("Cursor is for a byte range; pass it with offset/length reads")
+        line, position = resume["line"], resume["offset"]
+        start_line = line
+    if start_line < 1:
+        raise RangeError("start_line must be 1 or more")
+    if end_line is None:
+        end_line = start_line + DEFAULT_PAGE_LINES - 1
+    if end_line < start_line:
+        raise RangeError("end_line must not be before start_line")
+
+    size = stat.st_size
+    data = b""
+    split = False    # Stopped inside a line longer than MAX_RANGE_BYTES
+    if size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            # Skip to the first requested line
+            while line < start_line and position < size:
+                newline = view.find(b"\n", position)
+                position = size if newline == -1 else newline + 1
+                line += 1
+            begin = position
+            limit = begin + MAX_RANGE_BYTES
+            # Take whole lines until end_line or the byte cap
+            while line <= end_line and position < size and position < limit:
+                newline = view.find(b"\n", position, limit)
+                if newline != -1:
+                    position = newline + 1
+                elif limit >= size:
+                    position = size
+                else:
+                    position, split = limit, True
+                    break
+                line += 1
+            data = view[begin:position]
+
+    text, used = _decode(data, encoding, final=not split)
+    position = begin + used if split else position
+    eof = position >= size
+    return {
+        "content": text,
+        "start_line": start_line,
+        "end_line": line if split else line - 1,
+        "total_size": size,
+        "line_count": count_lines(path, size),
+        "eof": eof,
+        "next_cursor": None if eof else make_cursor(stat, position, line),
+    }
+
+
+def read_range(path: str, encoding: str = "utf-8", offset: Optional[int] = None,
+               length: Optional[int] = None, start_line: Optional[int] = None,
+               end_line: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Dispatch to a line or byte range read from request parameters"""
+    if start_line is not None or end_line is not None:
+        return read_line_range(path, start_line or 1, end_line, encoding, cursor)
+    if cursor:
+        resume = parse_cursor(cursor, os.stat(path))
+        if resume["line"] is not None:
+            return read_line_range(path, encoding=encoding, cursor=cursor)
+        offset = resume["offset"]
+    return read_byte_range(path, offset or 0, length, encoding)
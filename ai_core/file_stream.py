@@ -0,0 +1,135 @@
+"""
+Raw File Streaming
+Send a file's bytes as-is, with Range support, at constant memory.
+
+RawFileResponse never loads the file: when the ASGI server offers the
+"http.response.zerocopysend" extension the kernel copies the file straight
+to the socket (sendfile); otherwise it is read and sent in fixed-size
+chunks from a worker thread. A single "Range: bytes=..." request gets a 206
+with just that slice, an unsatisfiable one a 416. Streaming stops as soon
+as the client disconnects.
+"""
+
+import asyncio
+import mimetypes
+import os
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi.responses import Response
+
+from ai_core.http_cache import file_validators
+
+CHUNK_SIZE = 256 * 1024    # Bytes per read when zero-copy send is unavailable
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=start-end" range into (start, end_exclusive)
+
+    Returns None when the whole file should be sent (no header, a unit
+    other than bytes, or several ranges). Raises ValueError when the range
+    cannot be satisfied.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size
+    except ValueError:
+        return None
+    end = min(end, size)
+    if start >= size or start >= end:
+        raise ValueError(f"Range not satisfiable for {size} bytes")
+    return start, end
+
+
+class RawFileResponse(Response):
+    """Stream a file (or one byte range of it) without buffering it in memory"""
+
+    def __init__(self, path: str, stat: os.stat_result, request_headers: Any,
+                 filename: Optional[str] = None, method: str = "GET",
+                 validators: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.size = stat.st_size
+        self.send_body = method != "HEAD"
+        self.background = None
+        headers = dict(validators or file_validators(stat, path))
+        headers["Accept-Ranges"] = "bytes"
+        headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        headers["Content-Disposition"] = f"inline; filename*=utf-8''{quote(filename or os.path.basename(path))}"
+
+        self.start, self.end = 0, self.size
+        self.status_code = 200
+        try:
+            byte_range = parse_range(request_headers.get("range"), self.size)
+        except ValueError:
+            self.status_code = 416
+            self.end = 0
+            headers["Content-Range"] = f"bytes */{self.size}"
+            byte_range = None
+        if byte_range and self._if_range_matches(request_headers.get("if-range"), headers):
+            self.start, self.end = byte_range
+            self.status_code = 206
+            headers["Content-Range"] = f"bytes {self.start}-{self.end - 1}/{self.size}"
+        headers["Content-Length"] = str(self.end - self.start)
+        self.raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+
+    @staticmethod
+    def _if_range_matches(if_range: Optional[str], validators: Dict[str, str]) -> bool:
+        """A Range applies only if If-Range (when sent) names the current version"""
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        return if_range in (validators["ETag"], validators["ETag"].removeprefix("W/"),
+                            validators["Last-Modified"])
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.end <= self.start:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        zero_copy = "http.response.zerocopysend" in scope.get("extensions", {})
+        sender = asyncio.create_task(self._send_file(send, zero_copy))
+        watcher = asyncio.create_task(self._wait_for_disconnect(receive))
+        done, pending = await asyncio.wait({sender, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if sender in done:
+            sender.result()
+
+    async def _send_file(self, send: Any, zero_copy: bool) -> None:
+        with open(self.path, "rb") as f:
+            if zero_copy:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.end - self.start,
+                    "more_body": False,
+                })
+                return
+            position = self.start
+            while position < self.end:
+                chunk = await asyncio.to_thread(os.pread, f.fileno(), min(CHUNK_SIZE, self.end - position), position)
+                if not chunk:
+                    break    # File shrank while streaming
+                position += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": position < self.end})
+            if position < self.end:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    @staticmethod
+    async def _wait_for_disconnect(receive: Any) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
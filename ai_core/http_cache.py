@@ -0,0 +1,159 @@
+"""
+HTTP Caching and Compression
+Conditional GET (ETag / Last-Modified) and gzip/brotli negotiation helpers.
+
+Static payloads such as openapi.json are serialized and compressed once
+with StaticPayload. File reads get validators from the file's mtime and
+size via file_validators(), so an unchanged file can be answered with
+304 Not Modified before it is even opened. The ETag also hashes whatever
+selects the representation (the resolved path, the encoding), since a
+POST endpoint's URL does not say which file was read; for the same reason
+only If-None-Match is honored on methods other than GET and HEAD, never
+If-Modified-Since or "*". Bodies above a size threshold are compressed
+with the best encoding the client accepts; brotli is used only when the
+optional brotli package is installed. Large bodies are compressed in a
+worker thread so the event loop keeps serving other requests meanwhile.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024    # Bytes; smaller bodies are not worth compressing
+COMPRESS_THREAD_SIZE = 64 * 1024    # Bytes; larger bodies are compressed off the event loop
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def file_validators(stat: os.stat_result, *variant: Any) -> Dict[str, str]:
+    """ETag and Last-Modified headers for a file, from its mtime and size
+
+    Anything in variant that selects what is sent (path, encoding, ...) is
+    hashed into the ETag, so two representations never share one.
+    """
+    etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    if variant:
+        key = "\0".join("" if value is None else str(value) for value in variant)
+        etag += "-" + hashlib.sha256(key.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    return {
+        "ETag": f'W/"{etag}"',
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+
+
+def is_not_modified(request: Request, validators: Dict[str, str]) -> bool:
+    """True if the client's cached copy (If-None-Match / If-Modified-Since) is current
+
+    On a POST the body picks the resource, so only an exact ETag counts.
+    """
+    safe = request.method in ("GET", "HEAD")
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = validators.get("ETag", "").removeprefix("W/")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return (safe and "*" in tags) or etag in tags
+
+    if not safe:
+        return False
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in validators:
+        try:
+            return parsedate_to_datetime(validators["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(validators: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=validators)
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """Pick "br" or "gzip" from Accept-Encoding, or None for identity"""
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+async def encoded_response(request: Request, body: bytes, media_type: str,
+                           headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> Response:
+    """Build a response, compressing body if it is large enough and the client accepts it"""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = negotiate_encoding(request) if len(body) >= COMPRESS_MIN_SIZE else None
+    if encoding:
+        if len(body) >= COMPRESS_THREAD_SIZE:
+            body = await asyncio.to_thread(compress, body, encoding)
+        else:
+            body = compress(body, encoding)    # Faster than a thread hop
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+async def json_response(request: Request, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize content (a dict or Pydantic model) to JSON and send it with encoded_response()"""
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return await encoded_response(request, body, "application/json", headers)
+
+
+class StaticPayload:
+    """A response body serialized, hashed and compressed once at startup"""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        self.validators = {"ETag": f'"{hashlib.sha256(body).hexdigest()[:32]}"'}
+        self.variants = {None: body}
+        if len(body) >= COMPRESS_MIN_SIZE:
+            self.variants["gzip"] = compress(body, "gzip")
+            if brotli is not None:
+                self.variants["br"] = compress(body, "br")
+
+    @classmethod
+    def from_json_file(cls, path: str) -> "StaticPayload":
+        """Load and validate a JSON file, then re-serialize it compactly"""
+        with open(path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+        return cls(json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def response(self, request: Request) -> Response:
+        if is_not_modified(request, self.validators):
+            return not_modified_response(self.validators)
+        headers = dict(self.validators, Vary="Accept-Encoding")
+        encoding = negotiate_encoding(request)
+        if encoding not in self.variants:
+            encoding = None
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
@@ -0,0 +1,234 @@
+"""
+Prometheus Metrics
+Low-overhead counters, gauges and histograms in the Prometheus text format.
+
+Every FastAPI service adds MetricsMiddleware, which records request latency
+per route, in-flight requests and responses by status, and serves the
+registry at GET /metrics. record_generation() turns the timing fields
+Ollama returns with each generation (eval_count, eval_duration,
+prompt_eval_count, prompt_eval_duration, load_duration) into per-model
+throughput metrics. No client library is needed.
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Generations take seconds; the smaller buckets are for cache hits and file reads
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """A value that goes up and down"""
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}   # values -> [bucket counts, sum, count]
+
+    def observe(self, *label_values: str, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for values, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labels, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """The set of metrics a process exposes"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP metrics, recorded by MetricsMiddleware
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route"]))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP responses by route and status code", ["method", "route", "status"]))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"))
+HTTP_ERRORS = REGISTRY.register(Counter(
+    "http_request_errors_total", "HTTP requests that failed with a 5xx or an exception", ["method", "route"]))
+REQUESTS_CANCELLED = REGISTRY.register(Counter(
+    "http_requests_cancelled_total", "Requests whose upstream work was cancelled, by reason", ["reason"]))
+
+# Ollama generation metrics, recorded by record_generation()
+GENERATION_DURATION = REGISTRY.register(Histogram(
+    "ollama_generation_duration_seconds", "Wall-clock time of Ollama generations", ["model"]))
+GENERATION_ERRORS = REGISTRY.register(Counter(
+    "ollama_generation_errors_total", "Ollama generations that failed", ["model"]))
+EVAL_TOKENS = REGISTRY.register(Counter(
+    "ollama_eval_tokens_total", "Tokens generated (eval_count)", ["model"]))
+EVAL_SECONDS = REGISTRY.register(Counter(
+    "ollama_eval_seconds_total", "Time spent generating tokens (eval_duration)", ["model"]))
+PROMPT_TOKENS = REGISTRY.register(Counter(
+    "ollama_prompt_eval_tokens_total", "Prompt tokens evaluated (prompt_eval_count)", ["model"]))
+PROMPT_SECONDS = REGISTRY.register(Counter(
+    "ollama_prompt_eval_seconds_total", "Time spent evaluating prompts (prompt_eval_duration)", ["model"]))
+LOAD_SECONDS = REGISTRY.register(Histogram(
+    "ollama_load_duration_seconds", "Model load time per generation (load_duration)", ["model"]))
+TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "ollama_tokens_per_second", "Generation throughput (eval_count / eval_duration)", ["model"],
+    buckets=TOKENS_PER_SECOND_BUCKETS))
+
+
+def record_generation(model: str, result: Dict[str, Any], seconds: Optional[float] = None) -> None:
+    """Record the timing fields of a finished Ollama generation"""
+    if seconds is not None:
+        GENERATION_DURATION.observe(model, value=seconds)
+    eval_count = result.get("eval_count", 0)
+    eval_seconds = result.get("eval_duration", 0) / 1e9
+    EVAL_TOKENS.inc(model, amount=eval_count)
+    EVAL_SECONDS.inc(model, amount=eval_seconds)
+    PROMPT_TOKENS.inc(model, amount=result.get("prompt_eval_count", 0))
+    PROMPT_SECONDS.inc(model, amount=result.get("prompt_eval_duration", 0) / 1e9)
+    if "load_duration" in result:
+        LOAD_SECONDS.observe(model, value=result["load_duration"] / 1e9)
+    if eval_count and eval_seconds:
+        TOKENS_PER_SECOND.observe(model, value=eval_count / eval_seconds)
+
+
+def record_generation_error(model: str) -> None:
+    GENERATION_ERRORS.inc(model)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times requests and serves GET /metrics"""
+
+    def __init__(self, app: Any, path: str = "/metrics"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == self.path and scope["method"] == "GET":
+            await self._serve(send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Label by route template (/read-file), never by raw path, to bound cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(method, route, value=time.perf_counter() - started)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            if status >= 500:
+                HTTP_ERRORS.inc(method, route)
+
+    async def _serve(self, send: Any) -> None:
+        body = REGISTRY.render().encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", CONTENT_TYPE.encode()), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,119 @@
+"""
+Model Warmer
+Keep frequently used models resident in Ollama so requests skip cold loads.
+
+At startup every configured model is loaded with an empty-prompt
+/api/generate call that carries its keep_alive setting. A background task
+repeats this every rewarm_interval seconds, which should be shorter than
+keep_alive so Ollama never unloads the model. A failed pass is recorded
+and the next one runs on schedule. Every generation's load_duration is
+also recorded, so cold starts show up in the stats whether or not the
+warmer caused them.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from ai_core.ollama_client import OllamaError
+
+DEFAULT_KEEP_ALIVE = "30m"
+DEFAULT_REWARM_INTERVAL = 600.0    # Seconds between re-warm passes
+COLD_LOAD_THRESHOLD = 0.5          # Seconds of load_duration that count as a cold load
+RECENT_EVENTS = 50                 # Load events kept for /models/warm
+
+logger = logging.getLogger(__name__)
+
+
+def parse_keep_alive_map(spec: Optional[str]) -> Dict[str, str]:
+    """Parse "model=keep_alive,..." ("llama3.2:latest=30m,llama3=-1") into a dict
+
+    A model without "=" uses the default keep_alive.
+    """
+    models = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        model, _, keep_alive = item.partition("=")
+        models[model.strip()] = keep_alive.strip() or DEFAULT_KEEP_ALIVE
+    return models
+
+
+class ModelWarmer:
+    """Preload models, keep them resident and record load events"""
+
+    def __init__(self, client: Any, models: Dict[str, str],
+                 rewarm_interval: float = DEFAULT_REWARM_INTERVAL):
+        self.client = client
+        self.models = models                  # model -> keep_alive
+        self.rewarm_interval = rewarm_interval
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=RECENT_EVENTS)
+        self.cold_loads: Dict[str, int] = {}
+        self.warm_failures: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def keep_alive_for(self, model: str) -> Optional[str]:
+        """keep_alive to send with a generation for model, if it is managed"""
+        return self.models.get(model)
+
+    async def start(self) -> None:
+        """Warm every model in the background and keep re-warming on schedule"""
+        if self.models and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.warm_all()
+            except Exception:
+                # warm() records its own failures; anything else must not end keep-warm
+                logger.exception("Model warm pass failed")
+            await asyncio.sleep(self.rewarm_interval)
+
+    async def warm_all(self) -> None:
+        # A BackendPool is warmed host by host, since each host loads models separately
+        clients = [backend.client for backend in getattr(self.client, "backends", [])] or [self.client]
+        await asyncio.gather(*(self.warm(model, client) for model in self.models for client in clients))
+
+    async def warm(self, model: str, client: Any = None) -> None:
+        """Load model (a no-op if resident) and refresh its keep_alive timer"""
+        try:
+            result = await (client or self.client).generate(model, "", keep_alive=self.models[model])
+            self.record(result, source="warmer")
+        except Exception as e:
+            if not isinstance(e, OllamaError):
+                logger.warning("Warming %s failed: %r", model, e)
+            self.warm_failures[model] = self.warm_failures.get(model, 0) + 1
+            self.events.append({"model": model, "source": "warmer", "error": str(e), "at": time.time()})
+
+    def record(self, result: Dict[str, Any], source: str = "request") -> None:
+        """Note the load time Ollama reported for a generation"""
+        load_seconds = result.get("load_duration", 0) / 1e9
+        if load_seconds < COLD_LOAD_THRESHOLD:
+            return
+        model = result.get("model", "unknown")
+        self.cold_loads[model] = self.cold_loads.get(model, 0) + 1
+        self.events.append({
+            "model": model,
+            "source": source,
+            "load_seconds": round(load_seconds, 3),
+            "at": time.time(),
+        })
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Managed models, cold-load counts and recent load events"""
+        return {
+            "models": self.models,
+            "rewarm_interval_seconds": self.rewarm_interval,
+            "cold_loads": self.cold_loads,
+            "warm_failures": self.warm_failures,
+            "recent_loads": list(self.events),
+        }
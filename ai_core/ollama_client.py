@@ -0,0 +1,248 @@
+"""
+Shared Ollama Client
+Connection-pooled access to the local Ollama API used by every service.
+
+All services talk to Ollama through this module instead of calling
+requests.post() directly. Connections are kept alive between calls, every
+call has its own timeout, and transient connection failures are retried.
+The async client is for FastAPI handlers; the sync client is for Flask.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+# Default Ollama location - override with the OLLAMA_BASE_URL environment variable
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+
+DEFAULT_TIMEOUT = 60.0      # Seconds to wait for a full generation
+CONNECT_TIMEOUT = 5.0       # Seconds to wait for the TCP connection itself
+DEFAULT_RETRIES = 2         # Extra attempts after a transient failure
+RETRY_BACKOFF = 0.5         # Seconds, doubled after every failed attempt
+MAX_CONNECTIONS = 20        # Pool size per client
+MAX_KEEPALIVE = 10          # Idle connections kept open for reuse
+
+# Failures that happen before Ollama starts working on the request, so
+# retrying them cannot duplicate a generation
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+RETRYABLE_STATUS = {502, 503, 504}
+
+
+class OllamaError(Exception):
+    """Raised when Ollama cannot be reached or answers with an error
+
+    connect_failed is True only when no connection could be made, so the
+    request never reached Ollama; a timeout while it was working is not one.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 connect_failed: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.connect_failed = connect_failed
+
+    @property
+    def unavailable(self) -> bool:
+        """True when Ollama could not be reached at all"""
+        return self.status_code is None
+
+
+def _client_options(base_url: str, timeout: float, max_connections: int) -> Dict[str, Any]:
+    """Keyword arguments shared by the async and sync httpx clients"""
+    return {
+        "base_url": base_url,
+        "timeout": httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(MAX_KEEPALIVE, max_connections),
+        ),
+    }
+
+
+def _generate_payload(model: str, prompt: str, options: Optional[Dict[str, Any]],
+                      stream: bool, extra: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the JSON body for /api/generate"""
+    payload = {"model": model, "prompt": prompt, "stream": stream}
+    if options:
+        payload["options"] = options
+    payload.update({key: value for key, value in extra.items() if value is not None})
+    return payload
+
+
+def _check_response(response: httpx.Response) -> None:
+    """Turn an HTTP error status from Ollama into an OllamaError"""
+    if response.status_code != 200:
+        raise OllamaError(
+            f"Ollama service error: {response.status_code} {response.text}",
+            status_code=response.status_code,
+        )
+
+
+class OllamaClient:
+    """Async Ollama client with keep-alive pooling, timeouts and retries"""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, max_connections: int = MAX_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled httpx client, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                **_client_options(self.base_url, self.timeout, self.max_connections)
+            )
+        return self._client
+
+    async def request(self, method: str, path: str, json: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> httpx.Response:
+        """Send a request to Ollama, retrying transient connection failures"""
+        delay = RETRY_BACKOFF
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.request(
+                    method, path, json=json,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    raise OllamaError(f"Cannot connect to Ollama at {self.base_url}: {e}",
+                                      connect_failed=True)
+            except httpx.TimeoutException as e:
+                raise OllamaError(f"Ollama request timed out: {e}")
+            except httpx.HTTPError as e:
+                raise OllamaError(f"Ollama request failed: {e}")
+            else:
+                if response.status_code not in RETRYABLE_STATUS or attempt == self.retries:
+                    _check_response(response)
+                    return response
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    async def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                       timeout: Optional[float] = None, **extra: Any) -> Dict[str, Any]:
+        """Run a non-streaming /api/generate call and return Ollama's JSON reply"""
+        payload = _generate_payload(model, prompt, options, False, extra)
+        response = await self.request("POST", "/api/generate", json=payload, timeout=timeout)
+        return response.json()
+
+    async def stream_generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                              timeout: Optional[float] = None, **extra: Any) -> AsyncIterator[Dict[str, Any]]:
+        """Run a streaming /api/generate call, yielding each NDJSON chunk as it arrives
+
+        Connection failures are retried only before the first chunk, so a
+        retry can never repeat tokens the caller has already seen.
+        """
+        payload = _generate_payload(model, prompt, options, True, extra)
+        request = self.client.build_request(
+            "POST", "/api/generate", json=payload,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        delay = RETRY_BACKOFF
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.send(request, stream=True)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    raise OllamaError(f"Cannot connect to Ollama at {self.base_url}: {e}",
+                                      connect_failed=True)
+            except httpx.HTTPError as e:
+                raise OllamaError(f"Ollama request failed: {e}")
+            await asyncio.sleep(delay)
+            delay *= 2
+
+        try:
+            if response.status_code != 200:
+                await response.aread()
+                _check_response(response)
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+        except httpx.TimeoutException as e:
+            raise OllamaError(f"Ollama request timed out: {e}")
+        except httpx.HTTPError as e:
+            raise OllamaError(f"Ollama stream interrupted: {e}")
+        finally:
+            await response.aclose()
+
+    async def tags(self, timeout: Optional[float] = 5.0) -> Dict[str, Any]:
+        """List the models installed on the Ollama server"""
+        response = await self.request("GET", "/api/tags", timeout=timeout)
+        return response.json()
+
+    async def ps(self, timeout: Optional[float] = 5.0) -> Dict[str, Any]:
+        """List the models currently loaded in memory"""
+        response = await self.request("GET", "/api/ps", timeout=timeout)
+        return response.json()
+
+    async def embed(self, model: str, text: str, timeout: Optional[float] = 10.0) -> List[float]:
+        """Return the embedding vector of text from an Ollama embedding model"""
+        response = await self.request(
+            "POST", "/api/embed", json={"model": model, "input": text}, timeout=timeout
+        )
+        return response.json()["embeddings"][0]
+
+    async def aclose(self) -> None:
+        """Close all pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class SyncOllamaClient:
+    """Blocking counterpart of OllamaClient for WSGI apps such as Flask"""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, max_connections: int = MAX_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.client = httpx.Client(**_client_options(self.base_url, timeout, max_connections))
+
+    def request(self, method: str, path: str, json: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None) -> httpx.Response:
+        """Send a request to Ollama, retrying transient connection failures"""
+        delay = RETRY_BACKOFF
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.client.request(
+                    method, path, json=json,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    raise OllamaError(f"Cannot connect to Ollama at {self.base_url}: {e}",
+                                      connect_failed=True)
+            except httpx.TimeoutException as e:
+                raise OllamaError(f"Ollama request timed out: {e}")
+            except httpx.HTTPError as e:
+                raise OllamaError(f"Ollama request failed: {e}")
+            else:
+                if response.status_code not in RETRYABLE_STATUS or attempt == self.retries:
+                    _check_response(response)
+                    return response
+            time.sleep(delay)
+            delay *= 2
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None, **extra: Any) -> Dict[str, Any]:
+        """Run a non-streaming /api/generate call and return Ollama's JSON reply"""
+        payload = _generate_payload(model, prompt, options, False, extra)
+        return self.request("POST", "/api/generate", json=payload, timeout=timeout).json()
+
+    def tags(self, timeout: Optional[float] = 5.0) -> Dict[str, Any]:
+        """List the models installed on the Ollama server"""
+        return self.request("GET", "/api/tags", timeout=timeout).json()
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        self.client.close()
@@ -0,0 +1,216 @@
+"""
+Path Policy
+Decide which local paths the file endpoints may touch.
+
+Allow rules are directories (everything below them) or glob patterns; deny
+rules are globs (or absolute directories) and win over allows. Rules are
+compiled once: directories into a sorted list of disjoint roots searched
+by bisection, globs into one regular expression per kind, so the cost of a
+decision barely grows with the number of rules. Patterns without a leading
+"/" match at any depth ("*.pem", ".git/**"), and "**" crosses directory
+boundaries.
+
+Decisions are made on the real path (symlinks resolved), which costs a
+syscall per path component. Resolved decisions are kept in a bounded cache
+keyed on the path as given, so repeated checks are a dict lookup. Entries
+expire after ttl seconds and are dropped early by invalidate() when a
+directory changes, so a swapped symlink cannot keep an old decision for long.
+"""
+
+import bisect
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_CACHE_SIZE = 8192
+DEFAULT_TTL = 5.0    # Seconds a resolved decision is trusted without an invalidation
+
+GLOB_CHARS = set("*?[")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Regex source for a glob over absolute paths"""
+    anchored = pattern.startswith("/")
+    i, out = 0, []
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            start = i + 1
+            if pattern[start:start + 1] == "!":
+                start += 1
+            if pattern[start:start + 1] == "]":
+                start += 1    # A leading "]" is part of the class
+            end = pattern.find("]", start)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ("" if anchored else "(?:.*/)?") + "".join(out)
+
+
+def compile_globs(globs: Iterable[str]) -> Optional["re.Pattern[str]"]:
+    """One regex matching any of globs, or None if there are none"""
+    parts = [glob_to_regex(glob.rstrip("/")) for glob in globs]
+    if not parts:
+        return None
+    return re.compile("(?:" + "|".join(parts) + r")\Z", re.DOTALL)
+
+
+def compile_roots(directories: Iterable[str]) -> List[str]:
+    """Real directory paths with a trailing "/", sorted, with nested ones dropped
+
+    What is left never contains one root inside another, so the only root
+    that can contain a path is the last one sorting at or before it.
+    """
+    roots = sorted({os.path.realpath(os.path.expanduser(d)).rstrip("/") + "/" for d in directories})
+    disjoint: List[str] = []
+    for root in roots:
+        if not disjoint or not root.startswith(disjoint[-1]):
+            disjoint.append(root)
+    return disjoint
+
+
+def under_roots(roots: List[str], real_path: str) -> bool:
+    """True if real_path is one of roots or below one"""
+    path = real_path + "/"
+    i = bisect.bisect_right(roots, path)
+    return i > 0 and path.startswith(roots[i - 1])
+
+
+class PathPolicy:
+    """Compiled allow/deny rules with a cache of resolved decisions"""
+
+    def __init__(self, allow: Iterable[str], deny: Iterable[str] = (),
+                 cache_size: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_TTL):
+        self.allow_rules = [rule for rule in allow if rule]
+        self.deny_rules = [rule for rule in deny if rule]
+        is_glob = lambda rule: bool(GLOB_CHARS & set(rule))
+        # Allow entries without glob characters are directories
+        self._allow_roots = compile_roots(r for r in self.allow_rules if not is_glob(r))
+        self._allow_globs = compile_globs(r for r in self.allow_rules if is_glob(r))
+        # Deny entries are globs, except absolute paths without glob characters (directories).
+        # Globs on the last component alone ("*.pem", ".env") are matched against the
+        # file name only, which avoids trying every "/" in the path.
+        self._deny_roots = compile_roots(r for r in self.deny_rules if r.startswith("/") and not is_glob(r))
+        globs = [r.rstrip("/") for r in self.deny_rules if not (r.startswith("/") and not is_glob(r))]
+        names = [g for g in globs if "/" not in g]
+        # Plain names and "*.ext" suffixes need no regex at all
+        self._deny_exact = {g for g in names if not is_glob(g)}
+        self._deny_suffixes = tuple(g[1:] for g in names if g.startswith("*") and not is_glob(g[1:]))
+        self._deny_names = compile_globs("/" + g for g in names
+                                         if is_glob(g) and not (g.startswith("*") and not is_glob(g[1:])))
+        self._deny_paths = compile_globs(g for g in globs if "/" in g and g.startswith("/"))
+        # Floating globs ("node_modules/**") are searched for from a "/": a literal start
+        # lets the regex engine skip ahead instead of trying every split of the path
+        floating = [glob_to_regex("/" + g) for g in globs if "/" in g and not g.startswith("/")]
+        self._deny_floating = re.compile("(?:" + "|".join(floating) + r")\Z", re.DOTALL) if floating else None
+        self.cache_size = cache_size
+        self.ttl = ttl
+        # path as given -> (real path or None if denied, expires)
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, allow: Iterable[str]) -> "PathPolicy":
+        """Policy for allow plus AI_DENIED_PATHS globs (separated by os.pathsep)"""
+        return cls(
+            allow,
+            deny=[p for p in os.environ.get("AI_DENIED_PATHS", "").split(os.pathsep) if p],
+            cache_size=int(os.environ.get("AI_PATH_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+            ttl=float(os.environ.get("AI_PATH_CACHE_TTL", DEFAULT_TTL)),
+        )
+
+    def decide(self, real_path: str) -> bool:
+        """Decision for an already resolved path (no filesystem access)"""
+        if not under_roots(self._allow_roots, real_path) and \
+                (self._allow_globs is None or self._allow_globs.match(real_path) is None):
+            return False
+        if self._deny_roots and under_roots(self._deny_roots, real_path):
+            return False
+        name_start = real_path.rfind("/")
+        name = real_path[name_start + 1:]
+        if name in self._deny_exact or (self._deny_suffixes and name.endswith(self._deny_suffixes)):
+            return False
+        if self._deny_names is not None and self._deny_names.match(real_path, name_start) is not None:
+            return False
+        if self._deny_floating is not None and self._deny_floating.search(real_path) is not None:
+            return False
+        return self._deny_paths is None or self._deny_paths.match(real_path) is None
+
+    def resolve(self, path: str) -> Optional[str]:
+        """The real path if path is allowed, else None"""
+        entry = self._cache.get(path)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        try:
+            real = os.path.realpath(path)
+        except (OSError, ValueError):
+            return None
+        result = real if self.decide(real) else None
+        with self._lock:
+            if len(self._cache) >= self.cache_size:
+                # Evict the oldest insertion; cheaper than LRU bookkeeping on every hit
+                self._cache.pop(next(iter(self._cache)), None)
+            self._cache[path] = (result, time.monotonic() + self.ttl)
+        return result
+
+    def is_allowed(self, path: str) -> bool:
+        return self.resolve(path) is not None
+
+    def filter(self, paths: Iterable[str]) -> List[str]:
+        """The allowed paths, as given, in order"""
+        return [path for path in paths if self.resolve(path) is not None]
+
+    def invalidate(self, directory: Optional[str] = None) -> None:
+        """Forget decisions for paths under directory (or all of them)"""
+        with self._lock:
+            self.invalidations += 1
+            if directory is None:
+                self._cache.clear()
+                return
+            prefix = directory.rstrip("/") + "/"
+            stale = [path for path, (real, _) in self._cache.items()
+                     if path.startswith(prefix) or path == directory
+                     or (real is not None and (real.startswith(prefix) or real == directory))]
+            for path in stale:
+                del self._cache[path]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "allow_rules": len(self.allow_rules),
+            "deny_rules": len(self.deny_rules),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._cache),
+            "cache_size": self.cache_size,
+            "ttl_seconds": self.ttl,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,123 @@
+"""
+Prompt Budget
+Assemble prompts from prioritized sections that fit a per-model token budget.
+
+Token counts come from a fast approximate tokenizer - one regex pass that
+counts short words, pieces of long words and punctuation marks, which
+tracks BPE tokenizers closely enough to budget with and errs on the high
+side. When the sections do not fit, the most important ones are kept whole
+and the rest are cut middle-out (the start and end of a pasted file or
+alert payload usually matter most) or dropped. Every assembled prompt
+reports the tokens each section used, so prompt-eval time stays
+predictable instead of growing with whatever the caller pasted in.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from ai_core.scheduler import parse_model_limits
+
+DEFAULT_PROMPT_TOKENS = 1536    # Fits Ollama's default 2048-token context with room for the answer
+OMITTED_MARKER = "\n[... {count} tokens omitted ...]\n"
+
+# Words of up to 6 characters, pieces of longer words, and single punctuation marks
+TOKEN_RE = re.compile(r"\w{1,6}|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate number of model tokens in text"""
+    return len(TOKEN_RE.findall(text))
+
+
+def truncate_middle(text: str, max_tokens: int) -> str:
+    """Keep the first and last tokens of text, replacing the middle with a marker"""
+    spans = [match.span() for match in TOKEN_RE.finditer(text)]
+    if len(spans) <= max_tokens:
+        return text
+    # The marker itself costs a few tokens
+    keep = max_tokens - count_tokens(OMITTED_MARKER.format(count=len(spans)))
+    if keep <= 0:
+        return ""
+    head, tail = (keep + 1) // 2, keep // 2
+    marker = OMITTED_MARKER.format(count=len(spans) - keep)
+    start = text[:spans[head - 1][1]] if head else ""
+    end = text[spans[len(spans) - tail][0]:] if tail else ""
+    return start + marker + end
+
+
+def budget_for(model: str, budgets: Optional[Dict[str, int]] = None) -> int:
+    """Prompt token budget for model, from AI_PROMPT_BUDGETS="model=tokens,..." by default"""
+    if budgets is None:
+        budgets = parse_model_limits(os.environ.get("AI_PROMPT_BUDGETS"))
+    return budgets.get(model, int(os.environ.get("AI_PROMPT_TOKENS", DEFAULT_PROMPT_TOKENS)))
+
+
+class Section:
+    """A piece of a prompt
+
+    priority: lower numbers are kept first (0 = must keep).
+    min_tokens: below this a truncated section is dropped instead.
+    truncatable: False for text that must be sent whole or not at all.
+    """
+
+    def __init__(self, name: str, text: str, priority: int = 1, min_tokens: int = 0,
+                 truncatable: bool = True):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        self.min_tokens = min_tokens
+        self.truncatable = truncatable
+
+
+class AssembledPrompt:
+    """The prompt text plus what it cost"""
+
+    def __init__(self, text: str, budget: int, sections: Dict[str, Dict[str, Any]]):
+        self.text = text
+        self.budget = budget
+        self.sections = sections
+        self.tokens = sum(section["tokens"] for section in sections.values())
+        self.truncated = any(section["tokens"] < section["original_tokens"] for section in sections.values())
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": self.tokens,
+            "budget": self.budget,
+            "truncated": self.truncated,
+            "sections": self.sections,
+        }
+
+
+def assemble(sections: List[Section], budget: int) -> AssembledPrompt:
+    """Join sections in order, shrinking the least important ones to fit budget
+
+    Sections are admitted by priority; one that does not fit in what is
+    left is cut middle-out, or dropped if truncatable is False or the
+    remainder is under its min_tokens. Priority 0 sections are always kept
+    whole, even over budget.
+    """
+    counts = [count_tokens(section.text) for section in sections]
+    texts = [section.text for section in sections]
+    if sum(counts) > budget:
+        remaining = budget - sum(count for section, count in zip(sections, counts) if section.priority == 0)
+        order = sorted(range(len(sections)), key=lambda i: sections[i].priority)
+        for i in order:
+            section = sections[i]
+            if section.priority == 0:
+                continue
+            if counts[i] <= remaining:
+                remaining -= counts[i]
+            elif section.truncatable and remaining >= max(section.min_tokens, 1):
+                texts[i] = truncate_middle(section.text, remaining)
+                remaining = 0
+            else:
+                texts[i] = ""
+    report = {
+        section.name: {
+            "tokens": count if text is section.text else count_tokens(text),
+            "original_tokens": count,
+        }
+        for section, text, count in zip(sections, texts, counts)
+    }
+    return AssembledPrompt("".join(texts), budget, report)
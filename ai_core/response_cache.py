@@ -0,0 +1,171 @@
+"""
+Response Cache
+Exact-match cache for Ollama answers, keyed on (model, prompt, options).
+
+A size-bounded LRU with a time-to-live sits in memory. An optional SQLite
+file behind it keeps answers across restarts; entries found on disk are
+promoted back into memory. Disk writes are queued to a background thread
+with its own connection, so a slow commit never stalls the event loop; the
+answer is already in memory by then, so a lookup never misses it. Hit and
+miss counters are kept for /cache/stats.
+"""
+
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_ENTRIES = 1024     # Answers kept in memory
+DEFAULT_TTL = 3600.0           # Seconds before an answer is considered stale
+MAX_PENDING_WRITES = 10000     # Disk writes queued beyond this are dropped
+
+
+def make_cache_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Hash the model, rendered prompt and generation options into a cache key"""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "options": options or {}},
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU + TTL cache with an optional on-disk tier"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL,
+                 disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=MAX_PENDING_WRITES)
+        self._writer: Optional[threading.Thread] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.dropped_writes = 0
+
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            # WAL lets lookups read while the writer thread commits
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+            self._db.commit()
+            self._writer = threading.Thread(target=self._write_loop, args=(disk_path,),
+                                            name="response-cache-writer", daemon=True)
+            self._writer.start()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires FROM responses WHERE key = ? AND expires > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Cache an answer under key"""
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires)
+        if self._writer is not None:
+            self._queue_write(("set", key, json.dumps(value), expires))
+
+    def _queue_write(self, write: tuple) -> None:
+        try:
+            self._writes.put_nowait(write)
+        except queue.Full:
+            self.dropped_writes += 1    # The answer is still cached in memory
+
+    def _write_loop(self, disk_path: str) -> None:
+        """Apply queued writes in order, one commit per batch that is waiting"""
+        db = sqlite3.connect(disk_path)
+        try:
+            while True:
+                batch = [self._writes.get()]
+                while not self._writes.empty() and batch[-1] is not None:
+                    batch.append(self._writes.get_nowait())
+                for write in batch:
+                    if write is None:
+                        break
+                    if write[0] == "set":
+                        db.execute(
+                            "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+                            write[1:],
+                        )
+                    else:
+                        db.execute("DELETE FROM responses")
+                db.commit()
+                if batch[-1] is None:
+                    return
+        finally:
+            db.close()
+
+    def _store(self, key: str, value: Dict[str, Any], expires: float) -> None:
+        """Put an entry in memory and evict the least recently used overflow"""
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached answer, in memory and on disk"""
+        with self._lock:
+            self._entries.clear()
+        if self._writer is not None:
+            # Queued behind any pending sets, so none of them survives the clear
+            self._writes.put(("clear",))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self._db is not None,
+            "pending_writes": self._writes.qsize(),
+            "dropped_writes": self.dropped_writes,
+        }
+
+    def close(self) -> None:
+        """Flush queued writes and close the on-disk tier"""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,176 @@
+"""
+Model Request Scheduler
+Admission control and priority queueing in front of Ollama generations.
+
+Each model gets a concurrency limit. Requests over the limit wait in a
+bounded priority queue: interactive traffic is admitted before batch
+traffic, first-come first-served within a class. When the queue is
+full, or a request waits longer than the queue timeout, the scheduler
+raises SchedulerBusy so the service can fail fast with 429/503 and a
+Retry-After hint instead of letting requests pile up.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Priority classes - lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+DEFAULT_CONCURRENCY = 2        # Generations per model running at once
+DEFAULT_MAX_QUEUE = 64         # Requests allowed to wait per model
+DEFAULT_QUEUE_TIMEOUT = 30.0   # Seconds a request may wait for a slot
+
+
+class SchedulerBusy(Exception):
+    """Raised when a request cannot be admitted"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code      # 429 queue full, 503 waited too long
+        self.retry_after = retry_after      # Seconds the client should back off
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers to send with the error response"""
+        return {"Retry-After": str(self.retry_after)}
+
+
+def parse_model_limits(spec: Optional[str]) -> Dict[str, int]:
+    """Parse "model=limit,model=limit" (e.g. from an environment variable)"""
+    limits = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            model, limit = item.rsplit("=", 1)
+            limits[model.strip()] = int(limit)
+    return limits
+
+
+class Slot:
+    """A granted concurrency slot; release() is safe to call more than once"""
+
+    def __init__(self, scheduler: "ModelScheduler", model: str):
+        self._scheduler = scheduler
+        self._model = model
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._scheduler._release(self._model, time.monotonic() - self._started)
+
+
+class _ModelQueue:
+    """Running count, waiters and counters for one model"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        self.waiters: List[tuple] = []      # heap of (priority, seq, future)
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.avg_service_time = 1.0         # Seconds, exponentially weighted
+
+
+class ModelScheduler:
+    """Per-model concurrency limits with a bounded priority wait queue"""
+
+    def __init__(self, default_concurrency: int = DEFAULT_CONCURRENCY,
+                 model_limits: Optional[Dict[str, int]] = None,
+                 max_queue: int = DEFAULT_MAX_QUEUE,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        self.default_concurrency = default_concurrency
+        self.model_limits = model_limits or {}
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._models: Dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, model: str) -> _ModelQueue:
+        if model not in self._models:
+            self._models[model] = _ModelQueue(self.model_limits.get(model, self.default_concurrency))
+        return self._models[model]
+
+    def _retry_after(self, queue: _ModelQueue) -> int:
+        """Estimate how long until the current backlog drains"""
+        backlog = queue.queued + queue.running
+        return max(1, math.ceil(backlog * queue.avg_service_time / queue.limit))
+
+    async def acquire(self, model: str, priority: int = PRIORITY_INTERACTIVE) -> Slot:
+        """Wait for a slot on model, or raise SchedulerBusy"""
+        queue = self._queue(model)
+        if queue.running < queue.limit and not queue.queued:
+            queue.running += 1
+            queue.admitted += 1
+            return Slot(self, model)
+
+        if queue.queued >= self.max_queue:
+            queue.rejected += 1
+            raise SchedulerBusy(
+                f"Too many queued requests for {model}", 429, self._retry_after(queue)
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue.waiters, (priority, next(self._seq), waiter))
+        queue.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up - pass it on
+                Slot(self, model).release()
+            else:
+                waiter.cancel()
+                queue.queued -= 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            queue.timed_out += 1
+            raise SchedulerBusy(
+                f"Timed out waiting for a {model} slot", 503, self._retry_after(queue)
+            )
+        queue.admitted += 1
+        return Slot(self, model)
+
+    def _release(self, model: str, held_for: float) -> None:
+        """Hand the slot to the next live waiter, or free it"""
+        queue = self._models[model]
+        queue.avg_service_time = 0.8 * queue.avg_service_time + 0.2 * held_for
+        while queue.waiters:
+            _, _, waiter = heapq.heappop(queue.waiters)
+            if not waiter.cancelled():
+                queue.queued -= 1
+                waiter.set_result(None)
+                return
+        queue.running -= 1
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[Slot]:
+        """Hold a slot on model for the duration of the block"""
+        granted = await self.acquire(model, priority)
+        try:
+            yield granted
+        finally:
+            granted.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Running, queued and rejected counts per model"""
+        return {
+            model: {
+                "limit": queue.limit,
+                "running": queue.running,
+                "queued": queue.queued,
+                "admitted": queue.admitted,
+                "rejected": queue.rejected,
+                "timed_out": queue.timed_out,
+                "avg_service_seconds": round(queue.avg_service_time, 3),
+            }
+            for model, queue in self._models.items()
+        }
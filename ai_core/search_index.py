@@ -0,0 +1,364 @@
+"""
+Search Index
+An on-disk inverted index of the text files under the allowed directories.
+
+Each file is split into lower-case word tokens. For every (term, file) the
+index stores how often the term occurs and where: the token position (for
+phrase queries), the line number and the byte offset of that line, so a
+snippet costs one pread rather than a re-read of the file. The index lives
+in SQLite in WAL mode, so queries never wait behind indexing.
+
+It follows a DirectoryIndex: every rescanned directory is queued, and only
+files whose size or modification time changed are tokenised again, so both
+restarts and edits cost work in proportion to what changed. Files the
+path policy denies are never read, and are dropped if they were indexed
+before the policy changed. Queries rank files with BM25 and return the
+matching lines as snippets.
+"""
+
+import heapq
+import math
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ai_core.dir_index import DirectoryIndex, FileEntry
+
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024    # Larger files are listed but not indexed
+SNIPPET_CHARS = 240
+BINARY_SNIFF_BYTES = 8192
+BM25_K1, BM25_B = 1.2, 0.75
+
+WORD_RE = re.compile(r"\w{2,64}")
+QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (term, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    return [word.lower() for word in WORD_RE.findall(text)]
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Unique terms of a query, and its "quoted phrases" as term lists"""
+    terms, phrases = [], []
+    for phrase, word in QUERY_RE.findall(query):
+        words = tokenize(phrase or word)
+        if phrase and len(words) > 1:
+            phrases.append(words)
+        terms.extend(w for w in words if w not in terms)
+    return terms, phrases
+
+
+def file_postings(data: bytes) -> Tuple[Dict[str, array], int]:
+    """term -> flat (position, line, line offset) triples, and the token count"""
+    postings: Dict[str, array] = {}
+    position = offset = 0
+    for line_number, line in enumerate(data.split(b"\n"), start=1):
+        for term in tokenize(line.decode("utf-8", errors="replace")):
+            triples = postings.get(term)
+            if triples is None:
+                triples = postings[term] = array("I")
+            triples.extend((position, line_number, offset))
+            position += 1
+        offset += len(line) + 1
+    return postings, position
+
+
+def unpack(blob: bytes) -> array:
+    triples = array("I")
+    triples.frombytes(blob)
+    return triples
+
+
+def contains_phrase(positions: List[Set[int]]) -> bool:
+    """True if some position p has p+i in the i-th term's positions for every i"""
+    return any(all(start + i in later for i, later in enumerate(positions[1:], start=1))
+               for start in positions[0])
+
+
+class SearchIndex:
+    """Inverted index kept in step with a DirectoryIndex"""
+
+    def __init__(self, directory_index: DirectoryIndex, path: str,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                 allowed: Optional[Callable[[str], bool]] = None):
+        self.directory_index = directory_index
+        self.path = path
+        self.max_file_bytes = max_file_bytes
+        self.allowed = allowed    # Paths it rejects are neither read nor stored
+        self.ready = False
+        self.indexed = 0
+        self.skipped = 0
+        self.queries = 0
+        self._queue: "queue.Queue[Tuple[Optional[str], Optional[Dict[str, FileEntry]]]]" = queue.Queue()
+        self._seen_dirs: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        # Opened by start(), so merely importing a service never touches the disk
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # file id -> (path, token count): ranking and filtering never touch SQLite
+        self._files: Dict[int, Tuple[str, int]] = {}
+        self._total_length = 0
+        directory_index.add_listener(lambda directory, files: self._queue.put((directory, files)))
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # -- lifecycle --
+
+    def start(self) -> None:
+        """Open (or create) the database, load the file table, and start indexing"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = self._connect()
+        self._db.executescript(SCHEMA)
+        self._files = {
+            file_id: (file_path, length)
+            for file_id, file_path, length in self._db.execute("SELECT id, path, length FROM files")
+        }
+        self._total_length = sum(length for _, length in self._files.values())
+        self._thread = threading.Thread(target=self._run, name="search-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put((None, None))
+            self._thread.join(timeout=10)
+            self._thread = None
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _run(self) -> None:
+        writer = self._connect()
+        try:
+            while True:
+                try:
+                    directory, files = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    if not self.ready and self.directory_index.ready:
+                        self._sweep(writer)
+                    continue
+                if directory is None:
+                    break
+                self._sync_directory(writer, directory, files)
+        finally:
+            writer.close()
+
+    # -- indexing --
+
+    def _sync_directory(self, db: sqlite3.Connection, directory: str,
+                        files: Optional[Dict[str, FileEntry]]) -> None:
+        """Bring the index for one directory in line with its listing"""
+        if files is None:
+            self._seen_dirs.discard(directory)
+            files = {}
+        else:
+            self._seen_dirs.add(directory)
+            if self.allowed is not None:
+                files = {name: entry for name, entry in files.items() if self.allowed(entry.path)}
+        stored = {path: (file_id, size, mtime) for file_id, path, size, mtime
+                  in db.execute("SELECT id, path, size, mtime FROM files WHERE dir = ?", (directory,))}
+        for path, (file_id, size, mtime) in stored.items():
+            entry = files.get(os.path.basename(path))
+            if entry is None or (entry.size, entry.modified) != (size, mtime):
+                self._remove(db, file_id)
+        for entry in files.values():
+            old = stored.get(entry.path)
+            if old is None or (entry.size, entry.modified) != old[1:]:
+                self._add(db, directory, entry)
+        db.commit()
+
+    def _remove(self, db: sqlite3.Connection, file_id: int) -> None:
+        db.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+        db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        _, length = self._files.pop(file_id, (None, 0))
+        self._total_length -= length
+
+    def _add(self, db: sqlite3.Connection, directory: str, entry: FileEntry) -> None:
+        postings, length = {}, 0
+        if entry.size <= self.max_file_bytes:
+            try:
+                with open(entry.path, "rb") as f:
+                    data = f.read(self.max_file_bytes + 1)
+            except OSError:
+                return    # Gone or unreadable; the next rescan decides
+            if b"\0" not in data[:BINARY_SNIFF_BYTES] and len(data) <= self.max_file_bytes:
+                postings, length = file_postings(data)
+        # Skipped files are still recorded, so they are not re-read until they change
+        file_id = db.execute(
+            "INSERT INTO files (path, dir, size, mtime, length) VALUES (?, ?, ?, ?, ?)",
+            (entry.path, directory, entry.size, entry.modified, length),
+        ).lastrowid
+        db.executemany(
+            "INSERT INTO postings (term, file_id, count, positions) VALUES (?, ?, ?, ?)",
+            ((term, file_id, len(triples) // 3, triples.tobytes()) for term, triples in postings.items()),
+        )
+        self._files[file_id] = (entry.path, length)
+        self._total_length += length
+        if length:
+            self.indexed += 1
+        else:
+            self.skipped += 1
+
+    def _sweep(self, db: sqlite3.Connection) -> None:
+        """Drop files from directories that disappeared while we were not running"""
+        stale = [file_id for file_id, directory in db.execute("SELECT id, dir FROM files")
+                 if directory not in self._seen_dirs]
+        for file_id in stale:
+            self._remove(db, file_id)
+        db.commit()
+        self.ready = True
+
+    # -- queries --
+
+    def _term_counts(self, term: str) -> Dict[int, int]:
+        with self._lock:
+            if self._db is None:
+                return {}    # Not started
+            return dict(self._db.execute("SELECT file_id, count FROM postings WHERE term = ?", (term,)))
+
+    def _positions(self, term: str, file_ids: Iterable[int]) -> Dict[int, array]:
+        found = {}
+        ids = list(file_ids)
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT file_id, positions FROM postings WHERE term = ? AND file_id IN "
+                    f"({','.join('?' * len(chunk))})", (term, *chunk))
+                found.update((file_id, unpack(blob)) for file_id, blob in rows)
+        return found
+
+    def search(self, query: str, limit: int = 20, directory: Optional[str] = None,
+               extensions: Optional[Set[str]] = None, match_all: bool = True,
+               snippets: int = 3, allowed: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+        """Files matching query, best first, with up to snippets matching lines each
+
+        Words are matched whole and case-insensitively; "quoted phrases"
+        must appear as consecutive words. allowed, if given, is asked about
+        each ranked path before it is returned.
+        """
+        started = time.perf_counter()
+        self.queries += 1
+        terms, phrases = parse_query(query)
+        counts = {term: self._term_counts(term) for term in terms}
+
+        candidates: Set[int] = set()
+        for i, term in enumerate(sorted(terms, key=lambda t: len(counts[t]))):
+            if match_all:
+                candidates = set(counts[term]) if i == 0 else candidates & counts[term].keys()
+            else:
+                candidates |= counts[term].keys()
+        # Copied once: the indexing thread may change _files while we rank
+        files = {file_id: self._files.get(file_id) for file_id in candidates}
+        prefix = os.path.realpath(directory) + os.sep if directory else None
+        candidates = {
+            file_id for file_id, info in files.items() if info is not None
+            and (prefix is None or info[0].startswith(prefix))
+            and (not extensions or os.path.splitext(info[0])[1].lower() in extensions)
+        }
+        for phrase in phrases:
+            positions = [self._positions(term, candidates) for term in phrase]
+            candidates = {file_id for file_id in candidates if all(file_id in p for p in positions)
+                          and contains_phrase([set(p[file_id][0::3]) for p in positions])}
+
+        # BM25
+        documents = max(len(self._files), 1)
+        average_length = max(self._total_length / documents, 1.0)
+        scores = []
+        for file_id in candidates:
+            length = files[file_id][1]
+            score = 0.0
+            for term in terms:
+                tf = counts[term].get(file_id)
+                if tf:
+                    df = len(counts[term])
+                    idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+                    score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+            scores.append((score, file_id))
+        if allowed is not None:
+            # Before counting, so total says nothing about files the caller cannot see
+            scores = [(score, file_id) for score, file_id in scores if allowed(files[file_id][0])]
+        top = heapq.nlargest(limit, scores)
+
+        hits = []
+        positions = {term: self._positions(term, [file_id for _, file_id in top]) for term in terms} if snippets else {}
+        for score, file_id in top:
+            path = files[file_id][0]
+            hits.append({
+                "path": path,
+                "score": round(score, 4),
+                "matches": sum(counts[term].get(file_id, 0) for term in terms),
+                "snippets": self._snippets(path, [p[file_id] for p in positions.values() if file_id in p], snippets),
+            })
+        return {
+            "query": query,
+            "hits": hits,
+            "total": len(scores),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _snippets(self, path: str, triples: List[array], limit: int) -> List[Dict[str, Any]]:
+        """The lines with the most distinct query terms, read straight from their offsets"""
+        if not triples:
+            return []
+        lines: Dict[Tuple[int, int], int] = {}
+        for term_triples in triples:
+            for line in set(zip(term_triples[1::3], term_triples[2::3])):
+                lines[line] = lines.get(line, 0) + 1
+        best = sorted(lines, key=lambda line: (-lines[line], line[0]))[:limit]
+        snippets = []
+        try:
+            with open(path, "rb") as f:
+                for line_number, offset in sorted(best):
+                    raw = os.pread(f.fileno(), SNIPPET_CHARS * 4, offset).split(b"\n", 1)[0]
+                    text = raw.decode("utf-8", errors="replace").rstrip("\r")
+                    snippets.append({"line": line_number, "text": text[:SNIPPET_CHARS]})
+        except OSError:
+            pass    # Removed since it was indexed
+        return snippets
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            db_bytes = sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal")
+                           if os.path.exists(self.path + suffix))
+        except OSError:
+            db_bytes = None
+        return {
+            "ready": self.ready,
+            "path": self.path,
+            "files": len(self._files),
+            "indexed_this_run": self.indexed,
+            "skipped_this_run": self.skipped,
+            "pending_directories": self._queue.qsize(),
+            "queries": self.queries,
+            "db_bytes": db_bytes,
+        }
@@ -0,0 +1,136 @@
+"""
+Semantic Cache
+Answer cache that matches paraphrased prompts by embedding similarity.
+
+Each prompt is embedded with an Ollama embedding model and compared with the
+prompts already answered for the same generation model. If the best cosine
+similarity reaches the threshold, the stored answer is returned instead of
+running a new generation. The index is bounded by entry count (LRU) and by
+age (TTL). numpy is used for the similarity search when it is installed.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_core.ollama_client import OllamaClient, OllamaError
+
+try:
+    import numpy as np
+except ImportError:  # Optional - falls back to a pure Python scan
+    np = None
+
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+DEFAULT_THRESHOLD = 0.92       # Minimum cosine similarity that counts as the same question
+DEFAULT_MAX_ENTRIES = 500      # Prompts kept in the index
+DEFAULT_TTL = 3600.0           # Seconds before a stored answer expires
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length so a dot product is the cosine similarity"""
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """Embedding-similarity cache in front of Ollama generation"""
+
+    def __init__(self, client: OllamaClient, embed_model: str = DEFAULT_EMBED_MODEL,
+                 threshold: float = DEFAULT_THRESHOLD, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL):
+        self.client = client
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (generation model, unit vector, answer, expires)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_key = 0
+        self._matrices: Dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.last_similarity: Optional[float] = None
+
+    async def lookup(self, model: str, prompt: str) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """Find a stored answer for a similar prompt
+
+        Returns (answer or None, prompt embedding). Pass the embedding on to
+        store() so the prompt is not embedded twice. If the embedding model
+        fails or its reply is malformed, the lookup counts as a miss and the
+        embedding is None.
+        """
+        try:
+            vector = _normalize(await self.client.embed(self.embed_model, prompt))
+        except (OllamaError, KeyError, IndexError, TypeError, ValueError):
+            # ValueError covers a reply that is not JSON at all
+            self.errors += 1
+            return None, None
+
+        self._expire()
+        key, similarity = self._best_match(model, vector)
+        if key is not None and similarity >= self.threshold:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.last_similarity = round(similarity, 4)
+            return self._entries[key][2], vector
+
+        self.misses += 1
+        return None, vector
+
+    def store(self, model: str, answer: Dict[str, Any], vector: Optional[List[float]]) -> None:
+        """Remember an answer under the prompt embedding returned by lookup()"""
+        if vector is None:
+            return
+        self._entries[self._next_key] = (model, vector, answer, time.time() + self.ttl)
+        self._next_key += 1
+        self._matrices.pop(model, None)
+        while len(self._entries) > self.max_entries:
+            self._matrices.pop(self._entries.popitem(last=False)[1][0], None)
+
+    def _expire(self) -> None:
+        """Drop entries older than the TTL"""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry[3] <= now]
+        for key in expired:
+            self._matrices.pop(self._entries.pop(key)[0], None)
+
+    def _best_match(self, model: str, vector: List[float]) -> Tuple[Optional[int], float]:
+        """Return the key and similarity of the closest stored prompt for model"""
+        if np is not None:
+            if model not in self._matrices:
+                keys = [key for key, entry in self._entries.items() if entry[0] == model]
+                rows = [self._entries[key][1] for key in keys]
+                self._matrices[model] = (keys, np.array(rows, dtype=np.float32) if rows else None)
+            keys, matrix = self._matrices[model]
+            if matrix is None:
+                return None, 0.0
+            scores = matrix @ np.asarray(vector, dtype=np.float32)
+            best = int(scores.argmax())
+            return keys[best], float(scores[best])
+
+        best_key, best_score = None, 0.0
+        for key, entry in self._entries.items():
+            if entry[0] != model:
+                continue
+            score = sum(a * b for a, b in zip(entry[1], vector))
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and index size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "embedding_errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "last_hit_similarity": self.last_similarity,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "embed_model": self.embed_model,
+        }
@@ -0,0 +1,144 @@
+"""
+Conversation Sessions
+Keep each chat's Ollama context on the server so follow-ups skip re-evaluation.
+
+/api/generate returns a "context" array - the tokens of the conversation so
+far. Sending it back with the next prompt lets Ollama continue from its
+cache instead of re-evaluating the whole history as prompt text. The store
+keeps one context per session ID, compactly as 32-bit token arrays, with a
+time-to-live, a session count limit and a total memory budget; the least
+recently used sessions are evicted first.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_TTL = 1800.0                     # Seconds a session lives after its last turn
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024     # Memory budget for all stored contexts
+DEFAULT_MAX_CONTEXT_TOKENS = 32768       # Longer contexts keep only their newest tokens
+
+
+class Session:
+    """One conversation: its model, context tokens and turn count"""
+
+    def __init__(self, session_id: str, model: str):
+        self.id = session_id
+        self.model = model
+        self.tokens = array("i")
+        self.turns = 0
+        self.created = time.time()
+        self.last_used = self.created
+        self.lock = asyncio.Lock()    # Turns of one session run one at a time
+
+    @property
+    def context(self) -> Optional[List[int]]:
+        """The context to send with the next prompt, or None on the first turn"""
+        return self.tokens.tolist() if self.tokens else None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.tokens) * self.tokens.itemsize
+
+
+class SessionStore:
+    """TTL + LRU store of conversation contexts with a memory cap"""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_context_tokens: int = DEFAULT_MAX_CONTEXT_TOKENS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_context_tokens = max_context_tokens
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_held = 0
+        self.created = 0
+        self.resumed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def open(self, session_id: Optional[str], model: str) -> Session:
+        """Return the live session for session_id, or start a new one
+
+        A missing, expired or evicted ID, or one used with a different
+        model (context tokens are model specific), gets a fresh session
+        with a new ID - callers should always use the ID they get back.
+        """
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and now - session.last_used > self.ttl:
+                self._drop(session.id)
+                self.expired += 1
+                session = None
+            if session is not None and session.model == model:
+                self._sessions.move_to_end(session.id)
+                self.resumed += 1
+                return session
+
+            session = Session(uuid.uuid4().hex, model)
+            self._sessions[session.id] = session
+            self.created += 1
+            self._enforce_limits(now)
+            return session
+
+    def save(self, session: Session, context: Optional[List[int]]) -> None:
+        """Store the context Ollama returned after a turn"""
+        with self._lock:
+            if session.id not in self._sessions:
+                return    # Evicted or deleted while the turn was running
+            self.bytes_held -= session.nbytes
+            tokens = context or []
+            if len(tokens) > self.max_context_tokens:
+                tokens = tokens[-self.max_context_tokens:]
+            session.tokens = array("i", tokens)
+            self.bytes_held += session.nbytes
+            session.turns += 1
+            session.last_used = time.time()
+            self._sessions.move_to_end(session.id)
+            self._enforce_limits(session.last_used)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._drop(session_id)
+
+    def _drop(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self.bytes_held -= session.nbytes
+        return True
+
+    def _enforce_limits(self, now: float) -> None:
+        """Expire idle sessions, then evict least recently used ones over the caps"""
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used > self.ttl:
+                self._drop(oldest.id)
+                self.expired += 1
+            elif len(self._sessions) > self.max_sessions or self.bytes_held > self.max_bytes:
+                self._drop(oldest.id)
+                self.evicted += 1
+            else:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """Live sessions, memory held and lifecycle counters"""
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "bytes_held": self.bytes_held,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "created": self.created,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -1,15 +1,22 @@
+import json
 import requests
 
 def ask_ollama(user_message):
     payload = {
         "model": "llama3.2:latest",
         "prompt": f"You are a helpful assistant. User: {user_message}\nAssistant:",
-        "stream": False
+        "stream": True
     }
     
-    response = requests.post("http://localhost:11434/api/generate", json=payload)
-    return response.json()["response"]
+    answer = []
+    with requests.post("http://localhost:11434/api/generate", json=payload, stream=True) as response:
+        for line in response.iter_lines():
+            if line:
+                token = json.loads(line).get("response", "")
+                print(token, end="", flush=True)
+                answer.append(token)
+    print()
+    return "".join(answer)
 
 user_question = "What is the capital of France?"
 ai_response = ask_ollama(user_question)
-print(ai_response)
\ No newline at end of file
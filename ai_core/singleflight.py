@@ -0,0 +1,76 @@
+"""
+Single-Flight Request Coalescing
+Concurrent identical generation requests share one upstream Ollama call.
+
+The first caller for a key starts the call as a background task; callers
+that arrive while it is still running wait on the same task instead of
+starting their own. Every caller waits through asyncio.shield(), so one
+caller timing out or disconnecting never cancels the call for the others;
+once every caller has given up, the call itself is cancelled.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.leaders = 0        # Calls that actually reached Ollama
+        self.collapsed = 0      # Calls that joined an in-flight call instead
+        self.abandoned = 0      # Calls cancelled because every caller gave up
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None) -> Any:
+        """Return func()'s result, sharing one run among concurrent callers of key
+
+        timeout bounds how long this caller waits; the shared call keeps
+        running for everyone else if it expires.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        else:
+            self.collapsed += 1
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            if timeout is None:
+                return await asyncio.shield(task)
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if self._waiters.get(key) == 1 and not task.done():
+                # Nobody is left to read the result
+                task.cancel()
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                self.abandoned += 1
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        """Forget a finished call and mark its exception as retrieved"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """How many calls were collapsed into a shared upstream call"""
+        total = self.leaders + self.collapsed
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.leaders,
+            "collapsed_calls": self.collapsed,
+            "collapse_ratio": round(self.collapsed / total, 4) if total else 0.0,
+            "abandoned_calls": self.abandoned,
+        }
@@ -0,0 +1,206 @@
+"""
+Traffic Capture
+Record real requests to gzip JSONL so they can be replayed later.
+
+CaptureMiddleware is opt-in (services add it only when AI_CAPTURE_PATH is
+set). For every request it records the arrival time, method, path, query,
+JSON body, the headers that change the response (Range, If-None-Match,
+Accept-Encoding), status, time to first byte and total latency. Records are
+written by a background thread, so capturing adds no disk I/O to the
+request path. A redact hook sees each record before it is written and can
+mask fields or drop the record; redact_fields() masks the named fields in
+the query string, JSON bodies and form-encoded bodies while keeping their
+length, so replayed prompts keep their real sizes. Multipart bodies are
+not parsed and are recorded as text, so drop them with a custom hook if
+they may carry secrets.
+
+tests/replay_traffic.py re-issues a capture against any server.
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import unquote_plus
+
+MAX_BODY_BYTES = 1024 * 1024    # Larger bodies are noted but not stored
+SKIP_PATHS = ("/metrics",)
+REPLAY_HEADERS = {b"accept-encoding", b"if-none-match", b"if-modified-since", b"range", b"if-range"}
+
+Redactor = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def redact_fields(spec: Optional[str]) -> Optional[Redactor]:
+    """Build a redactor that masks the fields named in "field,field"
+
+    Fields are matched by name in the query string, in JSON bodies (at any
+    depth) and in form-encoded bodies. A masked string is replaced by a keyed hash repeated to the same
+    length: equal values still mask to equal strings, so cache hit
+    patterns survive replay, but the key is random per process and never
+    written out.
+    """
+    fields = {field.strip() for field in (spec or "").split(",") if field.strip()}
+    if not fields:
+        return None
+    key = os.urandom(16)
+
+    def mask_string(text: str) -> str:
+        digest = hashlib.blake2b(text.encode("utf-8"), key=key, digest_size=16).hexdigest()
+        return (digest * (len(text) // len(digest) + 1))[:len(text)]
+
+    def mask(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: (mask_string(v) if k in fields and isinstance(v, str) else mask(v)) for k, v in value.items()}
+        if isinstance(value, list):
+            return [mask(item) for item in value]
+        return value
+
+    def mask_pairs(text: str) -> str:
+        # "a=1&b=2" as in a query string or a form body; other text is left alone
+        pairs = []
+        for pair in text.split("&"):
+            name, sep, value = pair.partition("=")
+            if sep and unquote_plus(name) in fields:
+                value = mask_string(unquote_plus(value))    # Hex digits need no quoting
+            pairs.append(name + sep + value)
+        return "&".join(pairs)
+
+    def redact(record: Dict[str, Any]) -> Dict[str, Any]:
+        if record.get("query"):
+            record["query"] = mask_pairs(record["query"])
+        body = record.get("body")
+        record["body"] = mask_pairs(body) if isinstance(body, str) else mask(body)
+        return record
+
+    return redact
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a capture file in the order they were written
+
+    A file whose writer is still running or was killed is read up to its
+    last complete record.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, json.JSONDecodeError):
+            return    # A capture still being written, or cut off by a crash
+
+
+class CaptureWriter:
+    """Append records to a gzip JSONL file from a background thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1    # Never slow requests down to keep up with the disk
+
+    def _run(self) -> None:
+        # Each run appends a new gzip member; readers see one continuous stream
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                self.written += 1
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+
+class CaptureMiddleware:
+    """ASGI middleware that records each request for later replay"""
+
+    def __init__(self, app: Any, path: str, redact: Optional[Redactor] = None,
+                 skip_paths: Iterable[str] = SKIP_PATHS):
+        self.app = app
+        self.writer = CaptureWriter(path)
+        self.redact = redact
+        self.skip_paths = tuple(skip_paths)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter()
+        chunks, body_size = [], 0
+        status, first_byte, response_bytes = 500, None, 0
+
+        async def receive_wrapper() -> Dict[str, Any]:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                body_size += len(body)
+                if body_size <= MAX_BODY_BYTES:
+                    chunks.append(body)
+            return message
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status, first_byte, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self._record(scope, arrived, started, chunks, body_size, status, first_byte, response_bytes)
+
+    def _record(self, scope: Dict[str, Any], arrived: float, started: float, chunks: list,
+                body_size: int, status: int, first_byte: Optional[float], response_bytes: int) -> None:
+        raw = b"".join(chunks)
+        if body_size > MAX_BODY_BYTES:
+            body = None
+        else:
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                body = raw.decode("utf-8", errors="replace")
+        record = {
+            "ts": round(arrived, 6),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "headers": {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"] if k in REPLAY_HEADERS},
+            "body": body,
+            "body_bytes": body_size,
+            "status": status,
+            "ttfb_ms": round(first_byte * 1000, 2) if first_byte is not None else None,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "response_bytes": response_bytes,
+        }
+        if self.redact is not None:
+            record = self.redact(record)
+            if record is None:
+                return
+        self.writer.write(record)
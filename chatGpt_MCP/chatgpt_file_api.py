@@ -5,24 +5,121 @@ A web API that allows ChatGPT to read local files through HTTP requests
 Since ChatGPT can't use MCP, we create a web API it can call instead
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import json
+import re
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 import os
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import uvicorn
 
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.batch_reader import BatchReader, check_encoding
+from ai_core.dir_index import DirectoryIndex, list_directory, scan_directory
+from ai_core.file_cache import FileContentCache
+from ai_core.file_grep import GrepPool, compile_pattern
+from ai_core.file_reader import RangeError, is_ranged, read_range
+from ai_core.file_stream import RawFileResponse
+from ai_core.http_cache import file_validators, is_not_modified, json_response, not_modified_response
+from ai_core.metrics import MetricsMiddleware
+from ai_core.path_policy import PathPolicy
+from ai_core.search_index import SearchIndex
+
+# Security: Define allowed directories
+ALLOWED_DIRECTORIES = [
+    "/Users/bharathmr/Documents/AI-Coding",
+    "/Users/bharathmr/Projects"
+]
+# AI_ALLOWED_DIRECTORIES (separated by os.pathsep) replaces this list, e.g. to
+# serve only a benchmark's fixture tree
+ALLOWED_DIRECTORIES = [d for d in os.environ.get("AI_ALLOWED_DIRECTORIES", "").split(os.pathsep) if d] \
+    or ALLOWED_DIRECTORIES
+
+# Allow/deny decisions for every path an endpoint touches; AI_DENIED_PATHS adds
+# deny globs, e.g. "*.pem:.env:.git/**"
+path_policy = PathPolicy.from_env(ALLOWED_DIRECTORIES)
+
+# Live index of the allowed directories for /list-files - built in the background
+# at startup, kept current by inotify/watchdog, or by polling every AI_INDEX_POLL_INTERVAL
+dir_index = DirectoryIndex(
+    ALLOWED_DIRECTORIES,
+    poll_interval=float(os.environ.get("AI_INDEX_POLL_INTERVAL", 2.0))
+)
+# A changed directory may hold a swapped symlink; re-resolve paths below it
+dir_index.add_listener(lambda directory, files: path_policy.invalidate(directory))
+
+# Full-text index for /search, stored in SQLite at AI_SEARCH_INDEX_PATH and
+# updated from the directory index; AI_SEARCH_INDEX=0 turns it off
+search_index = None
+if os.environ.get("AI_DIR_INDEX", "1") != "0" and os.environ.get("AI_SEARCH_INDEX", "1") != "0":
+    search_index = SearchIndex(
+        dir_index,
+        path=os.environ.get("AI_SEARCH_INDEX_PATH", str(Path.home() / ".cache" / "ai-coding" / "search_index.db")),
+        max_file_bytes=int(os.environ.get("AI_SEARCH_MAX_FILE_BYTES", 1024 * 1024)),
+        allowed=path_policy.is_allowed
+    )
+
+# Worker processes for /grep, started on first use - AI_GREP_WORKERS=0 uses threads only
+grep_pool = GrepPool(
+    workers=int(os.environ["AI_GREP_WORKERS"]) if os.environ.get("AI_GREP_WORKERS") else None
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.environ.get("AI_DIR_INDEX", "1") != "0":
+        if search_index is not None:
+            search_index.start()
+        dir_index.start()
+    yield
+    grep_pool.close()
+    batch_reader.close()
+    dir_index.stop()
+    if search_index is not None:
+        search_index.stop()
+
 # Create FastAPI app
 app = FastAPI(
     title="ChatGPT File Reader API",
     description="API for ChatGPT to read local files",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Request latency, in-flight and error metrics, served at GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Decoded contents of recently read files, re-read when a file changes
+file_cache = FileContentCache(
+    max_bytes=int(os.environ.get("AI_FILE_CACHE_BYTES", 64 * 1024 * 1024)),
+    max_file_bytes=int(os.environ.get("AI_FILE_CACHE_MAX_FILE_BYTES", 4 * 1024 * 1024))
+)
+
+# Concurrent multi-file reads for /read-files, within per-file and per-batch byte caps
+batch_reader = BatchReader(
+    file_cache,
+    path_policy.is_allowed,
+    workers=int(os.environ.get("AI_BATCH_READ_WORKERS", 16)),
+    max_files=int(os.environ.get("AI_BATCH_MAX_FILES", 100)),
+    max_file_bytes=int(os.environ.get("AI_BATCH_MAX_FILE_BYTES", 1024 * 1024)),
+    max_total_bytes=int(os.environ.get("AI_BATCH_MAX_TOTAL_BYTES", 8 * 1024 * 1024))
 )
 
 # Request model
 class FileReadRequest(BaseModel):
     filepath: str
     encoding: Optional[str] = "utf-8"
+    # Optional range: bytes (offset/length), lines (start_line/end_line) or a cursor
+    offset: Optional[int] = None
+    length: Optional[int] = None
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    cursor: Optional[str] = None
 
 # Response model  
 class FileReadResponse(BaseModel):
@@ -30,20 +127,38 @@ class FileReadResponse(BaseModel):
     content: Optional[str] = None
     error: Optional[str] = None
     file_info: Optional[dict] = None
+    range: Optional[dict] = None
 
-# Security: Define allowed directories
-ALLOWED_DIRECTORIES = [
-    "/Users/bharathmr/Documents/AI-Coding",
-    "/Users/bharathmr/Projects"
-]
+# Batch request/response models
+class FileBatchReadRequest(BaseModel):
+    filepaths: List[str]
+    encoding: Optional[str] = "utf-8"
+    # Can only lower the server's AI_BATCH_MAX_FILE_BYTES / AI_BATCH_MAX_TOTAL_BYTES
+    max_file_bytes: Optional[int] = Field(None, ge=1)
+    max_total_bytes: Optional[int] = Field(None, ge=1)
+    stream: bool = False
+
+class FileBatchItem(BaseModel):
+    index: int
+    filepath: str
+    success: bool
+    status: int
+    content: Optional[str] = None
+    error: Optional[str] = None
+    truncated: bool = False
+    range: Optional[dict] = None
+    file_info: Optional[dict] = None
+
+class FileBatchReadResponse(BaseModel):
+    files: List[FileBatchItem]
+    succeeded: int
+    failed: int
+    bytes: int
+    took_ms: float
 
 def is_path_allowed(filepath: str) -> bool:
-    """Check if file path is within allowed directories"""
-    try:
-        abs_path = Path(filepath).resolve()
-        return any(str(abs_path).startswith(allowed_dir) for allowed_dir in ALLOWED_DIRECTORIES)
-    except:
-        return False
+    """Check if file path is within allowed directories and not denied"""
+    return path_policy.is_allowed(filepath)
 
 @app.get("/")
 async def root():
@@ -56,14 +171,16 @@ async def get_allowed_directories():
     return {"allowed_directories": ALLOWED_DIRECTORIES}
 
 @app.post("/read-file", response_model=FileReadResponse)
-async def read_file(request: FileReadRequest):
+async def read_file(request: FileReadRequest, http_request: Request):
     """
     Read a local file and return its contents
     ChatGPT can call this endpoint to access local files
+    Send the returned ETag in If-None-Match to get a 304 if the file is unchanged
     """
     try:
         # Security check
-        if not is_path_allowed(request.filepath):
+        real_path = path_policy.resolve(request.filepath)
+        if real_path is None:
             raise HTTPException(
                 status_code=403, 
                 detail="Access denied: File outside allowed directories"
@@ -86,40 +203,155 @@ async def read_file(request: FileReadRequest):
                 detail=f"Path is not a file: {request.filepath}"
             )
         
-        # Read file content
-        try:
-            with open(file_path, 'r', encoding=request.encoding) as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            # Try with different encoding for binary files
-            with open(file_path, 'r', encoding='latin-1') as f:
-                content = f.read()
+        # Answer 304 without reading if the client's copy is current
+        stat = file_path.stat()
+        range_args = (request.offset, request.length, request.start_line,
+                      request.end_line, request.cursor)
+        validators = file_validators(stat, real_path, request.encoding, *range_args)
+        if is_not_modified(http_request, validators):
+            return not_modified_response(validators)
+        
+        page = None
+        if is_ranged(*range_args):
+            # Read only the requested bytes or lines
+            try:
+                try:
+                    page = read_range(str(file_path), request.encoding, *range_args)
+                except UnicodeDecodeError:
+                    page = read_range(str(file_path), 'latin-1', *range_args)
+            except RangeError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            content = page.pop("content")
+        else:
+            # Read file content (served from memory while the file is unchanged)
+            try:
+                content = file_cache.read(str(file_path), request.encoding, stat)
+            except UnicodeDecodeError:
+                # Try with different encoding for binary files
+                content = file_cache.read(str(file_path), 'latin-1', stat)
         
         # Get file info
-        stat = file_path.stat()
         file_info = {
             "name": file_path.name,
             "size": stat.st_size,
             "extension": file_path.suffix,
-            "absolute_path": str(file_path.resolve())
+            "absolute_path": real_path
         }
         
-        return FileReadResponse(
+        return await json_response(http_request, FileReadResponse(
             success=True,
             content=content,
-            file_info=file_info
-        )
+            file_info=file_info,
+            range=page
+        ), headers=validators)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+@app.api_route("/raw", methods=["GET", "HEAD"])
+async def read_raw_file(filepath: str, http_request: Request):
+    """
+    Stream a local file's bytes as-is, without JSON wrapping
+    Supports Range requests ("Range: bytes=0-65535") for partial downloads
+    """
+    # Security check
+    if not is_path_allowed(filepath):
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied: File outside allowed directories"
+        )
+    
+    file_path = Path(filepath)
+    
+    if not file_path.exists():
+        raise HTTPException(
+            status_code=404,
+            detail=f"File not found: {filepath}"
+        )
+    
+    if not file_path.is_file():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Path is not a file: {filepath}"
+        )
+    
+    stat = file_path.stat()
+    validators = file_validators(stat, path_policy.resolve(filepath))
+    if is_not_modified(http_request, validators):
+        return not_modified_response(validators)
+    return RawFileResponse(str(file_path), stat, http_request.headers, method=http_request.method,
+                           validators=validators)
+
+@app.post("/read-files", response_model=FileBatchReadResponse)
+async def read_files(request: FileBatchReadRequest):
+    """
+    Read several local files in one request
+    Files are read concurrently; each entry reports its own success or error.
+    With stream=true, NDJSON entries are sent as each file finishes, followed
+    by a {"done": ...} summary. A file over the per-file limit is truncated and
+    its range.next_cursor continues it through /read-file
+    """
+    if not request.filepaths:
+        raise HTTPException(status_code=400, detail="filepaths must not be empty")
+    if len(request.filepaths) > batch_reader.max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {batch_reader.max_files} files can be read in one request"
+        )
+    try:
+        check_encoding(request.encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    results = batch_reader.read(request.filepaths, request.encoding,
+                                request.max_file_bytes, request.max_total_bytes)
+    if request.stream:
+        async def entry_stream():
+            async for entry in results:
+                entry.pop("bytes", None)
+                yield json.dumps(entry) + "\n"
+        return StreamingResponse(entry_stream(), media_type="application/x-ndjson")
+    
+    files, summary = [], {}
+    async for entry in results:
+        if "done" in entry:
+            summary = entry["done"]
+        else:
+            files.append(FileBatchItem(**entry))
+    files.sort(key=lambda item: item.index)
+    return FileBatchReadResponse(
+        files=files,
+        succeeded=summary["succeeded"],
+        failed=summary["failed"],
+        bytes=summary["bytes"],
+        took_ms=summary["took_ms"]
+    )
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit ratio and memory held by the file content cache"""
+    return {**file_cache.stats(), "paths": path_policy.stats(), "batches": batch_reader.stats()}
+
 @app.get("/list-files")
-async def list_files(directory: str = "/Users/bharathmr/Documents/AI-Coding"):
+async def list_files(
+    directory: str = "/Users/bharathmr/Documents/AI-Coding",
+    recursive: bool = False,
+    sort: str = "name",
+    order: str = "asc",
+    extension: Optional[List[str]] = Query(None),
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
     """
     List files in a directory
     Helps ChatGPT discover available files
+
+    Served from the live directory index when it covers the directory.
+    Results are paged: pass next_cursor back as cursor for the next page.
     """
     try:
         # Security check
@@ -143,29 +375,165 @@ async def list_files(directory: str = "/Users/bharathmr/Documents/AI-Coding"):
                 detail=f"Path is not a directory: {directory}"
             )
         
-        # List files
-        files = []
-        for item in dir_path.iterdir():
-            if item.is_file():
-                stat = item.stat()
-                files.append({
-                    "name": item.name,
-                    "path": str(item),
-                    "size": stat.st_size,
-                    "extension": item.suffix
-                })
+        options = {
+            "recursive": recursive,
+            "sort": sort,
+            "descending": order == "desc",
+            "limit": limit,
+            "cursor": cursor,
+            "extensions": {e.lower() if e.startswith(".") else "." + e.lower() for e in extension} if extension else None,
+            "min_size": min_size,
+            "max_size": max_size,
+            "allowed": path_policy.is_allowed
+        }
+        try:
+            page = None
+            if dir_index.covers(directory):
+                # A view that must be (re)sorted or filtered is built off the event loop
+                view_options = {k: v for k, v in options.items() if k not in ("descending", "limit", "cursor")}
+                if dir_index.has_view(directory, **view_options):
+                    page = dir_index.list(directory, **options)
+                else:
+                    page = await asyncio.to_thread(dir_index.list, directory, **options)
+        except KeyError:
+            page = None    # Created since the last index refresh
+        source = "index"
+        if page is None:
+            page = await asyncio.to_thread(list_directory, directory, **options)
+            source = "scan"
         
         return {
             "directory": directory,
-            "files": files,
-            "count": len(files)
+            "files": page["files"],
+            "count": len(page["files"]),
+            "total": page["total"],
+            "next_cursor": page["next_cursor"],
+            "source": source
         }
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+@app.get("/index/stats")
+async def get_index_stats():
+    """Directory index mode, size and refresh counts"""
+    return dir_index.stats()
+
+@app.get("/search")
+async def search_files(
+    q: str,
+    directory: Optional[str] = None,
+    extension: Optional[List[str]] = Query(None),
+    match: str = "all",
+    limit: int = Query(20, ge=1, le=100),
+    snippets: int = Query(3, ge=0, le=20)
+):
+    """
+    Full-text search across the allowed directories
+    Returns the best matching files with the matching lines, so ChatGPT
+    can find content without reading every file. Use "quotes" for phrases.
+    """
+    if search_index is None:
+        raise HTTPException(status_code=503, detail="Search index is disabled on this server")
+    if directory is not None and not is_path_allowed(directory):
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied: Directory outside allowed paths"
+        )
+    if match not in ("all", "any"):
+        raise HTTPException(status_code=400, detail="match must be 'all' or 'any'")
+    
+    try:
+        extensions = {e.lower() if e.startswith(".") else "." + e.lower() for e in extension} if extension else None
+        results = await asyncio.to_thread(
+            search_index.search, q, limit=limit, directory=directory,
+            extensions=extensions, match_all=match == "all", snippets=snippets,
+            allowed=path_policy.is_allowed
+        )
+        results["complete"] = search_index.ready
+        return results
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+@app.get("/search/stats")
+async def get_search_stats():
+    """Size and progress of the full-text search index"""
+    if search_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **search_index.stats()}
+
+class GrepRequest(BaseModel):
+    pattern: str
+    directory: str
+    ignore_case: bool = False
+    extensions: Optional[List[str]] = None
+    max_matches: int = 1000
+    timeout: float = 10.0
+
+def grep_candidates(directory: str, extensions: Optional[set]) -> List[tuple]:
+    """(path, size) of every file below directory, from the index when it covers it"""
+    try:
+        entries = dir_index.files(directory) if dir_index.covers(directory) else None
+    except KeyError:
+        entries = None
+    if entries is None:
+        entries, pending = [], [directory]
+        while pending:
+            try:
+                files, subdirs = scan_directory(pending.pop())
+            except OSError:
+                continue
+            entries.extend(files.values())
+            pending.extend(subdirs)
+    return [(entry.path, entry.size) for entry in entries
+            if (not extensions or entry.extension.lower() in extensions) and path_policy.is_allowed(entry.path)]
+
+@app.post("/grep")
+async def grep_files(request: GrepRequest):
+    """
+    Find lines matching a regular expression in every file below a directory
+    Streams NDJSON: one {"path", "line", "text"} object per matching line, then
+    a {"done": ...} summary saying whether max_matches or timeout cut it short
+    """
+    if not is_path_allowed(request.directory):
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied: Directory outside allowed paths"
+        )
+    if not Path(request.directory).is_dir():
+        raise HTTPException(
+            status_code=404,
+            detail=f"Directory not found: {request.directory}"
+        )
+    try:
+        regex = compile_pattern(request.pattern, request.ignore_case)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
+    
+    extensions = {e.lower() if e.startswith(".") else "." + e.lower() for e in request.extensions} if request.extensions else None
+    files = await asyncio.to_thread(grep_candidates, request.directory, extensions)
+    max_matches = min(max(request.max_matches, 1), 10000)
+    timeout = min(max(request.timeout, 0.1), 60.0)
+
+    async def match_stream():
+        async for result in grep_pool.search(regex, files, max_matches, timeout):
+            if "done" in result:
+                yield json.dumps(result) + "\n"
+            else:
+                yield "".join(json.dumps({"path": path, "line": line, "text": text}) + "\n"
+                              for path, line, text in result["matches"])
+
+    return StreamingResponse(match_stream(), media_type="application/x-ndjson")
+
+@app.get("/grep/stats")
+async def get_grep_stats():
+    """Grep worker pool size and usage"""
+    return grep_pool.stats()
+
 @app.get("/file-info")
 async def get_file_info(filepath: str):
     """Get information about a file without reading its content"""
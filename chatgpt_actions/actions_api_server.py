@@ -4,23 +4,120 @@ A FastAPI server designed specifically for ChatGPT Actions integration.
 Provides OpenAPI-compliant endpoints that ChatGPT can call directly.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-import requests
 import uvicorn
 from typing import Optional, List
+from contextlib import asynccontextmanager
 import json
 import os
+import sys
+import time
 from pathlib import Path
 
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.backend_pool import BackendPool
+from ai_core.cancellation import RequestCancelled, cancellations, run_cancellable
+from ai_core.file_cache import FileContentCache
+from ai_core.file_reader import RangeError, is_ranged, read_range
+from ai_core.file_stream import RawFileResponse
+from ai_core.http_cache import StaticPayload, file_validators, is_not_modified, json_response, not_modified_response
+from ai_core.metrics import MetricsMiddleware, record_generation, record_generation_error
+from ai_core.model_warmer import ModelWarmer, parse_keep_alive_map
+from ai_core.ollama_client import OllamaError
+from ai_core.path_policy import PathPolicy
+from ai_core.response_cache import ResponseCache, make_cache_key
+from ai_core.session_store import SessionStore
+from ai_core.scheduler import ModelScheduler, SchedulerBusy, PRIORITY_INTERACTIVE, parse_model_limits
+from ai_core.singleflight import SingleFlight
+from ai_core.traffic_capture import CaptureMiddleware, redact_fields
+
+# /status reports "degraded" once the last good probe is this many intervals old
+STATUS_STALE_AFTER = 3
+
+# Seconds an /ask may take, queueing included, before its generation is cancelled
+REQUEST_DEADLINE = float(os.environ.get("AI_REQUEST_DEADLINE", 300))
+
+# Shared, connection-pooled Ollama backends (30s per generation, as before)
+# Set OLLAMA_BACKENDS="http://host1:11434,http://host2:11434" to spread load
+ollama = BackendPool.from_env(timeout=30)
+
+# Exact-match answer cache - set AI_CACHE_PATH to keep answers across restarts
+cache = ResponseCache(
+    max_entries=int(os.environ.get("AI_CACHE_MAX_ENTRIES", 1024)),
+    ttl=float(os.environ.get("AI_CACHE_TTL", 3600)),
+    disk_path=os.environ.get("AI_CACHE_PATH")
+)
+
+# Decoded contents of recently read files, re-read when a file changes
+file_cache = FileContentCache(
+    max_bytes=int(os.environ.get("AI_FILE_CACHE_BYTES", 64 * 1024 * 1024)),
+    max_file_bytes=int(os.environ.get("AI_FILE_CACHE_MAX_FILE_BYTES", 4 * 1024 * 1024))
+)
+
+# Security: only files within the AI-Coding project (AI_CODING_BASE_DIR), minus
+# any AI_DENIED_PATHS globs - checked once per path, then cached
+file_policy = PathPolicy.from_env([os.environ.get("AI_CODING_BASE_DIR", "/Users/bharathmr/Documents/AI-Coding")])
+
+# Keep models resident - AI_PRELOAD_MODELS="llama3.2:latest=30m,llama3=10m"
+warmer = ModelWarmer(
+    ollama,
+    parse_keep_alive_map(os.environ.get("AI_PRELOAD_MODELS", "llama3.2:latest")),
+    rewarm_interval=float(os.environ.get("AI_REWARM_INTERVAL", 600))
+)
+
+# Identical concurrent questions share one Ollama generation
+inflight = SingleFlight()
+
+# Per-model concurrency limits with a bounded priority wait queue
+scheduler = ModelScheduler(
+    default_concurrency=int(os.environ.get("AI_MAX_CONCURRENCY", 2)),
+    model_limits=parse_model_limits(os.environ.get("AI_MODEL_CONCURRENCY")),
+    max_queue=int(os.environ.get("AI_MAX_QUEUE", 64)),
+    queue_timeout=float(os.environ.get("AI_QUEUE_TIMEOUT", 30))
+)
+
+# Multi-turn conversations keep Ollama's context server side
+sessions = SessionStore(
+    max_sessions=int(os.environ.get("AI_SESSION_MAX", 1000)),
+    ttl=float(os.environ.get("AI_SESSION_TTL", 1800)),
+    max_bytes=int(os.environ.get("AI_SESSION_MAX_BYTES", 64 * 1024 * 1024))
+)
+
+async def run_generation(model: str, prompt: str, priority: int = PRIORITY_INTERACTIVE,
+                         context: Optional[List[int]] = None) -> dict:
+    """Run one generation once the scheduler admits it"""
+    async with scheduler.slot(model, priority):
+        started = time.perf_counter()
+        try:
+            result = await ollama.generate(model=model, prompt=prompt, keep_alive=warmer.keep_alive_for(model),
+                                           context=context)
+        except OllamaError:
+            record_generation_error(model)
+            raise
+    record_generation(model, result, time.perf_counter() - started)
+    warmer.record(result)
+    return result
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ollama.start()
+    await warmer.start()
+    yield
+    await warmer.stop()
+    await ollama.aclose()
+    cache.close()
+
 # Create FastAPI app with CORS for ChatGPT Actions
 app = FastAPI(
     title="Local AI Actions API", 
     description="API for ChatGPT Actions to interact with local AI services and files",
     version="1.0.0",
-    openapi_url=None  # Disable auto-generated OpenAPI
+    openapi_url=None,  # Disable auto-generated OpenAPI
+    lifespan=lifespan
 )
 
 # Add CORS middleware for ChatGPT Actions
@@ -32,29 +129,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency, in-flight and error metrics, served at GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in traffic capture for replay - AI_CAPTURE_PATH=capture.jsonl.gz,
+# AI_CAPTURE_REDACT="message,filepath" masks those query, JSON and form fields
+if os.environ.get("AI_CAPTURE_PATH"):
+    app.add_middleware(CaptureMiddleware, path=os.environ["AI_CAPTURE_PATH"],
+                       redact=redact_fields(os.environ.get("AI_CAPTURE_REDACT")))
+
 # Pydantic models for API requests/responses
 class AskRequest(BaseModel):
     message: str = Field(..., description="The question or prompt to send to the local AI", example="What is machine learning?")
     model: Optional[str] = Field("llama3.2:latest", description="The AI model to use")
+    use_cache: Optional[bool] = Field(True, description="Set to false to skip cached answers and ask the model again")
+    session: Optional[bool] = Field(False, description="Set to true to start a conversation; the response carries its session_id")
+    session_id: Optional[str] = Field(None, description="session_id from an earlier response, to continue that conversation")
 
 class AskResponse(BaseModel):
     response: str = Field(..., description="The AI's response to your question")
     model_used: str = Field(..., description="The AI model that generated the response")
     success: bool = Field(..., description="Whether the request was successful")
+    session_id: Optional[str] = Field(None, description="Send this with the next question to continue the conversation")
 
 class FileRequest(BaseModel):
     filepath: str = Field(..., description="Absolute path to the file to read", example="/Users/bharathmr/Documents/AI-Coding/README.md")
+    offset: Optional[int] = Field(None, description="Byte offset to start reading from (byte-range read)")
+    length: Optional[int] = Field(None, description="Number of bytes to read (byte-range read, default 1 MiB)")
+    start_line: Optional[int] = Field(None, description="First line to read, 1-based (line-range read)")
+    end_line: Optional[int] = Field(None, description="Last line to read, inclusive (line-range read, default start_line + 499)")
+    cursor: Optional[str] = Field(None, description="next_cursor from a previous ranged read, to fetch the next page")
 
 class FileResponse(BaseModel):
     content: str = Field(..., description="The content of the file")
     filename: str = Field(..., description="Name of the file")
     size: int = Field(..., description="Size of file in bytes")
     success: bool = Field(..., description="Whether the file was read successfully")
+    total_size: Optional[int] = Field(None, description="Size of the whole file in bytes (ranged reads)")
+    line_count: Optional[int] = Field(None, description="Number of lines in the whole file, when cheap to count (ranged reads)")
+    offset: Optional[int] = Field(None, description="Byte offset the content starts at (byte-range reads)")
+    start_line: Optional[int] = Field(None, description="First line returned (line-range reads)")
+    end_line: Optional[int] = Field(None, description="Last line returned (line-range reads)")
+    eof: Optional[bool] = Field(None, description="Whether the content reaches the end of the file (ranged reads)")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to read the next page; null at end of file")
+
+class ModelInfo(BaseModel):
+    name: str = Field(..., description="Model name")
+    size: int = Field(..., description="Model size on disk in bytes")
+    loaded: bool = Field(..., description="Whether the model is loaded in memory")
 
 class StatusResponse(BaseModel):
     status: str = Field(..., description="Service status")
     ollama_available: bool = Field(..., description="Whether Ollama AI is running")
     models_available: List[str] = Field(..., description="List of available AI models")
+    models: List[ModelInfo] = Field([], description="Size and loaded state of each available model")
+    snapshot_age_seconds: Optional[float] = Field(None, description="Seconds since Ollama last answered a background health check")
 
 @app.get("/", response_model=dict, summary="Service Information")
 async def root():
@@ -65,50 +194,78 @@ async def root():
         "service": "Local AI Assistant API",
         "description": "ChatGPT Actions can use this API to interact with your local AI",
         "version": "1.0.0",
-        "endpoints": ["/ask", "/read-file", "/status"],
+        "endpoints": ["/ask", "/read-file", "/raw", "/status"],
         "documentation": "http://localhost:8080/docs"
     }
 
 @app.post("/ask", response_model=AskResponse, summary="Ask Local AI")
-async def ask_local_ai(request: AskRequest):
+async def ask_local_ai(request: AskRequest, http_request: Request):
     """
     Send a question to your local Ollama AI model.
     
     This endpoint allows ChatGPT to ask questions to your local AI model,
     creating a bridge between ChatGPT and your local AI infrastructure.
+    If the caller disconnects or AI_REQUEST_DEADLINE passes, the
+    generation is cancelled.
     """
+    key = make_cache_key(request.model, request.message)
+    in_session = bool(request.session or request.session_id)
+    if request.use_cache and not in_session:
+        cached = cache.get(key)
+        if cached is not None:
+            return AskResponse(response=cached["response"], model_used=request.model, success=True)
+
     try:
-        # Prepare request to local Ollama
-        ollama_payload = {
-            "model": request.model,
-            "prompt": request.message,
-            "stream": False
-        }
-        
-        # Send request to local Ollama service
-        response = requests.post(
-            "http://localhost:11434/api/generate", 
-            json=ollama_payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            ollama_response = response.json()
+        if in_session:
+            # Continue from the stored context; conversation turns are never cached
+            session = sessions.open(request.session_id, request.model)
+
+            async def session_turn():
+                async with session.lock:
+                    result = await run_generation(request.model, request.message, context=session.context)
+                    sessions.save(session, result.get("context"))
+                return result
+
+            ollama_response = await run_cancellable(http_request, session_turn(), REQUEST_DEADLINE)
             return AskResponse(
                 response=ollama_response["response"],
                 model_used=request.model,
-                success=True
+                success=True,
+                session_id=session.id
             )
-        else:
+        
+        # Send request to local Ollama service without blocking the event loop
+        ollama_response = await run_cancellable(http_request, inflight.do(
+            key, lambda: run_generation(request.model, request.message)
+        ), REQUEST_DEADLINE)
+        
+        cache.set(key, {"response": ollama_response["response"]})
+        return AskResponse(
+            response=ollama_response["response"],
+            model_used=request.model,
+            success=True
+        )
+            
+    except OllamaError as e:
+        if e.unavailable:
             raise HTTPException(
-                status_code=500, 
-                detail=f"Ollama service error: {response.status_code}"
+                status_code=503, 
+                detail=f"Cannot connect to local AI service: {str(e)}"
             )
-            
-    except requests.exceptions.RequestException as e:
         raise HTTPException(
-            status_code=503, 
-            detail=f"Cannot connect to local AI service: {str(e)}"
+            status_code=500, 
+            detail=f"Ollama service error: {e.status_code}"
+        )
+    except SchedulerBusy as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Local AI is busy: {str(e)}",
+            headers=e.headers
+        )
+    except RequestCancelled as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Request cancelled: {str(e)}"
         )
     except Exception as e:
         raise HTTPException(
@@ -117,22 +274,21 @@ async def ask_local_ai(request: AskRequest):
         )
 
 @app.post("/read-file", response_model=FileResponse, summary="Read Local File")
-async def read_local_file(request: FileRequest):
+async def read_local_file(request: FileRequest, http_request: Request):
     """
     Read the contents of a local file on your computer.
     
     This allows ChatGPT to access and analyze files on your local system
     through the Actions interface. Files must be within allowed directories.
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    when the file has not changed.
     """
     try:
         file_path = Path(request.filepath)
         
         # Security: Only allow files within the AI-Coding project
-        allowed_base = Path(os.environ.get("AI_CODING_BASE_DIR", "/Users/bharathmr/Documents/AI-Coding"))
-        try:
-            # Check if file is within allowed directory
-            file_path.resolve().relative_to(allowed_base.resolve())
-        except ValueError:
+        real_path = file_policy.resolve(request.filepath)
+        if real_path is None:
             raise HTTPException(
                 status_code=403,
                 detail="File access denied: Only files within AI-Coding project are allowed"
@@ -152,17 +308,36 @@ async def read_local_file(request: FileRequest):
                 detail=f"Path is not a file: {request.filepath}"
             )
         
-        # Read file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Answer 304 without reading if the client's copy is current
+        stat = file_path.stat()
+        range_args = (request.offset, request.length, request.start_line,
+                      request.end_line, request.cursor)
+        validators = file_validators(stat, real_path, *range_args)
+        if is_not_modified(http_request, validators):
+            return not_modified_response(validators)
+        
+        if is_ranged(*range_args):
+            # Read only the requested bytes or lines
+            try:
+                page = read_range(str(file_path), 'utf-8', *range_args)
+            except RangeError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            content = page.pop("content")
+        else:
+            # Read file content (served from memory while the file is unchanged)
+            content = file_cache.read(str(file_path), 'utf-8', stat)
+            page = {}
         
-        return FileResponse(
+        return await json_response(http_request, FileResponse(
             content=content,
             filename=file_path.name,
             size=len(content.encode('utf-8')),
-            success=True
-        )
+            success=True,
+            **{key: value for key, value in page.items() if key in FileResponse.model_fields}
+        ), headers=validators)
         
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
         raise HTTPException(
             status_code=400,
@@ -174,61 +349,143 @@ async def read_local_file(request: FileRequest):
             detail=f"Error reading file: {str(e)}"
         )
 
+@app.api_route("/raw", methods=["GET", "HEAD"], summary="Download Raw File")
+async def read_raw_file(filepath: str, http_request: Request):
+    """
+    Stream a local file's bytes unchanged, without JSON wrapping.
+    
+    Send a Range header (e.g. "bytes=0-65535") to get just part of the file
+    as a 206 response. Files must be within allowed directories.
+    """
+    file_path = Path(filepath)
+    
+    # Security: Only allow files within the AI-Coding project
+    if not file_policy.is_allowed(filepath):
+        raise HTTPException(
+            status_code=403,
+            detail="File access denied: Only files within AI-Coding project are allowed"
+        )
+    
+    if not file_path.exists():
+        raise HTTPException(
+            status_code=404,
+            detail=f"File not found: {filepath}"
+        )
+    
+    if not file_path.is_file():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Path is not a file: {filepath}"
+        )
+    
+    stat = file_path.stat()
+    validators = file_validators(stat, file_policy.resolve(filepath))
+    if is_not_modified(http_request, validators):
+        return not_modified_response(validators)
+    return RawFileResponse(str(file_path), stat, http_request.headers, method=http_request.method,
+                           validators=validators)
+
 @app.get("/status", response_model=StatusResponse, summary="Service Status")
 async def get_service_status():
     """
     Check the status of the local AI service and available models.
     
     This endpoint helps ChatGPT understand what AI capabilities are
-    available on your local system.
+    available on your local system. It is served from a snapshot that a
+    background task refreshes every OLLAMA_PROBE_INTERVAL seconds, so it
+    stays fast even when Ollama is slow or down.
     """
-    try:
-        # Check if Ollama is running
-        ollama_response = requests.get("http://localhost:11434/api/tags", timeout=5)
-        
-        if ollama_response.status_code == 200:
-            models_data = ollama_response.json()
-            available_models = [model["name"] for model in models_data.get("models", [])]
-            
-            return StatusResponse(
-                status="healthy",
-                ollama_available=True,
-                models_available=available_models
-            )
-        else:
-            return StatusResponse(
-                status="ollama_error",
-                ollama_available=False,
-                models_available=[]
-            )
-            
-    except requests.exceptions.RequestException:
-        return StatusResponse(
-            status="ollama_unavailable",
-            ollama_available=False,
-            models_available=[]
-        )
-    except Exception as e:
+    # Answered from the backend pool's background probes - never waits on Ollama
+    snapshot = ollama.snapshot()
+    age = snapshot["age_seconds"]
+    
+    if not snapshot["reachable"]:
+        status = "ollama_unavailable"
+    elif age is not None and age > STATUS_STALE_AFTER * snapshot["probe_interval"]:
+        status = "degraded"  # Ollama answered before but has been slow to answer since
+    elif snapshot["last_error"]:
+        status = "degraded"  # At least one backend is down
+    else:
+        status = "healthy"
+    
+    return StatusResponse(
+        status=status,
+        ollama_available=snapshot["reachable"],
+        models_available=[model["name"] for model in snapshot["models"]],
+        models=snapshot["models"],
+        snapshot_age_seconds=age
+    )
+
+@app.get("/cache/stats", summary="Response Cache Statistics")
+async def get_cache_stats():
+    """
+    Report how often /ask answers were served from the response cache
+    or shared with an identical request that was already running, and
+    how often /read-file was served from the file content cache.
+    """
+    stats = cache.stats()
+    stats["coalescing"] = inflight.stats()
+    stats["files"] = file_cache.stats()
+    stats["paths"] = file_policy.stats()
+    return stats
+
+@app.get("/sessions/stats", summary="Conversation Session Statistics")
+async def get_session_stats():
+    """
+    Report live conversation sessions and the memory their stored
+    Ollama contexts hold.
+    """
+    return sessions.stats()
+
+@app.delete("/sessions/{session_id}", summary="End Conversation Session")
+async def end_session(session_id: str):
+    """
+    Forget a conversation and free its stored context.
+    """
+    if not sessions.delete(session_id):
         raise HTTPException(
-            status_code=500,
-            detail=f"Error checking service status: {str(e)}"
+            status_code=404,
+            detail="Session not found"
         )
+    return {"deleted": session_id}
+
+@app.get("/scheduler/stats", summary="Scheduler Statistics")
+async def get_scheduler_stats():
+    """
+    Report running, queued and rejected generations per model, and how
+    many requests were cancelled by a client disconnect or deadline.
+    """
+    stats = scheduler.stats()
+    stats["cancelled"] = dict(cancellations, abandoned_shared_calls=inflight.abandoned)
+    return stats
+
+@app.get("/models/warm", summary="Model Warm-up Status")
+async def get_warm_stats():
+    """
+    Report preloaded models, cold-load counts and recent load events.
+    """
+    return warmer.stats()
+
+@app.get("/backends", summary="Ollama Backends")
+async def get_backends():
+    """
+    Report health, model inventory and load of each Ollama backend.
+    """
+    return ollama.stats()
+
+# Our custom OpenAPI schema, parsed, compressed and hashed once at startup
+try:
+    OPENAPI_PAYLOAD = StaticPayload.from_json_file(str(Path(__file__).parent / "openapi.json"))
+except Exception:
+    OPENAPI_PAYLOAD = None
 
 @app.get("/openapi.json")
-async def custom_openapi():
+async def custom_openapi(request: Request):
     """Serve our custom OpenAPI schema with proper HTTPS URLs and schema validation"""
-    try:
-        # Load our custom OpenAPI schema
-        current_dir = Path(__file__).parent
-        openapi_path = current_dir / "openapi.json"
-        
-        with open(openapi_path, 'r') as f:
-            openapi_schema = json.load(f)
-        
-        return JSONResponse(content=openapi_schema)
-    except Exception as e:
-        # Fallback to auto-generated schema if custom one fails
-        return app.openapi()
+    if OPENAPI_PAYLOAD is not None:
+        return OPENAPI_PAYLOAD.response(request)
+    # Fallback to auto-generated schema if custom one fails
+    return app.openapi()
 
 if __name__ == "__main__":
     print("🚀 Starting ChatGPT Actions API Server...")
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Suite
+Load tests AIService, the Actions API and the File Reader API against a stub Ollama
+
+Starts tests/stub_ollama.py and each service as local processes, drives
+every scenario at the chosen concurrency and reports throughput and
+p50/p95/p99 latency. --save writes the results as a JSON baseline;
+--compare checks a run against one and exits with status 1 if any
+scenario regressed by more than --tolerance.
+
+    python tests/benchmark.py --concurrency 16 --requests 400 --save tests/benchmark_baseline.json
+    python tests/benchmark.py --concurrency 16 --requests 400 --compare tests/benchmark_baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+STUB_PORT = 11555
+SERVICES = {
+    # name: (app directory, module, port)
+    "ai_service": (REPO_ROOT, "AIService", 18000),
+    "actions_api": (REPO_ROOT / "chatgpt_actions", "actions_api_server", 18080),
+    "file_api": (REPO_ROOT / "chatGpt_MCP", "chatgpt_file_api", 18001),
+}
+
+SMALL_FILE_BYTES = 4 * 1024
+LARGE_FILE_BYTES = 4 * 1024 * 1024
+
+
+def print_header(title):
+    """Print formatted header"""
+    print(f"\n{'📊 ' + title:=^80}")
+
+
+def scenarios(data_dir):
+    """Every scenario: name -> (service, method, path, request body for request i)"""
+    small = str(data_dir / "small.txt")
+    large = str(data_dir / "large.txt")
+    return {
+        "ai_ask_unique": ("ai_service", "POST", "/ask",
+                          lambda i: {"json": {"message": f"Benchmark question {i}", "use_cache": False}}),
+        "ai_ask_cached": ("ai_service", "POST", "/ask",
+                          lambda i: {"json": {"message": "Benchmark question"}}),
+        "ai_ask_stream": ("ai_service", "POST", "/ask/stream",
+                          lambda i: {"json": {"message": f"Streamed question {i}"}}),
+        "actions_ask": ("actions_api", "POST", "/ask",
+                        lambda i: {"json": {"message": f"Actions question {i}", "use_cache": False}}),
+        "actions_read_small": ("actions_api", "POST", "/read-file",
+                               lambda i: {"json": {"filepath": small}}),
+        "actions_read_large": ("actions_api", "POST", "/read-file",
+                               lambda i: {"json": {"filepath": large}}),
+        "file_api_read_small": ("file_api", "POST", "/read-file",
+                                lambda i: {"json": {"filepath": small}}),
+        "file_api_read_large": ("file_api", "POST", "/read-file",
+                                lambda i: {"json": {"filepath": large}}),
+        "file_api_raw_large": ("file_api", "GET", "/raw",
+                               lambda i: {"params": {"filepath": large}}),
+    }
+
+
+def make_test_files(data_dir):
+    line = "The quick brown fox jumps over the lazy dog 0123456789\n"
+    for name, size in (("small.txt", SMALL_FILE_BYTES), ("large.txt", LARGE_FILE_BYTES)):
+        (data_dir / name).write_text(line * (size // len(line)), encoding="utf-8")
+
+
+def start_processes(args, data_dir, state_dir):
+    """Start the stub and every service; returns the processes
+
+    The file services see only data_dir and keep their state (the search
+    index) in state_dir, so a run never reads or writes the developer's
+    own directories and its numbers do not depend on them.
+    """
+    env = dict(os.environ)
+    env.pop("OLLAMA_BACKENDS", None)
+    env.update({
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{STUB_PORT}",
+        "AI_CODING_BASE_DIR": str(data_dir),
+        "AI_ALLOWED_DIRECTORIES": str(data_dir),
+        "AI_SEARCH_INDEX_PATH": str(state_dir / "search_index.db"),
+        "AI_DIR_INDEX": "1",
+        "AI_GREP_WORKERS": "0",
+        "PYTHONUNBUFFERED": "1",
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    processes = [subprocess.Popen([
+        sys.executable, str(REPO_ROOT / "tests" / "stub_ollama.py"), "--port", str(STUB_PORT),
+        "--latency", str(args.latency), "--tokens-per-second", str(args.tokens_per_second),
+        "--tokens", str(args.tokens),
+    ], env=env)]
+    wait_until_ready(f"http://127.0.0.1:{STUB_PORT}/api/tags")
+
+    for name in sorted({SERVICES_FOR[s] for s in args.scenarios}):
+        app_dir, module, port = SERVICES[name]
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", f"{module}:app", "--app-dir", str(app_dir),
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ], env=env, cwd=str(data_dir)))
+        wait_until_ready(f"http://127.0.0.1:{port}/")
+    return processes
+
+
+def wait_until_ready(url, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def run_scenario(service, method, path, make_request, requests, concurrency):
+    """Send requests with a fixed number of concurrent workers; return the summary"""
+    port = SERVICES[service][2]
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120.0) as client:
+        # One warm-up request so connection setup and first-call work are not measured
+        await client.request(method, path, **make_request(-1))
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **make_request(i))
+                    await response.aread()
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    to_ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": to_ms(percentile(latencies, 0.50)),
+        "p95_ms": to_ms(percentile(latencies, 0.95)),
+        "p99_ms": to_ms(percentile(latencies, 0.99)),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print each scenario against the baseline; return the names that regressed"""
+    regressed = []
+    print_header("COMPARISON WITH BASELINE")
+    for name, result in results.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"➖ {name}: not in baseline")
+            continue
+        slower = result["p95_ms"] is not None and before["p95_ms"] and \
+            result["p95_ms"] > before["p95_ms"] * (1 + tolerance)
+        fewer = result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance)
+        failing = result["errors"] > before["errors"]
+        status = "❌" if slower or fewer or failing else "✅"
+        if status == "❌":
+            regressed.append(name)
+        print(f"{status} {name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms, "
+              f"throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s, "
+              f"errors {before['errors']} -> {result['errors']}")
+    return regressed
+
+
+SERVICES_FOR = {name: spec[0] for name, spec in scenarios(Path(".")).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark against a stub Ollama")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", default=list(SERVICES_FOR), choices=list(SERVICES_FOR))
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub prompt latency in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Stub generation speed")
+    parser.add_argument("--tokens", type=int, default=32, help="Tokens per stub answer")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the services, e.g. AI_MAX_CONCURRENCY=8")
+    parser.add_argument("--save", metavar="PATH", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ai-bench-") as tmp:
+        data_dir = Path(tmp).resolve() / "files"
+        state_dir = Path(tmp).resolve() / "state"
+        data_dir.mkdir()
+        state_dir.mkdir()
+        make_test_files(data_dir)
+        processes = start_processes(args, data_dir, state_dir)
+        try:
+            all_scenarios = scenarios(data_dir)
+            results = {}
+            print_header(f"BENCHMARK (concurrency {args.concurrency}, {args.requests} requests each)")
+            for name in args.scenarios:
+                result = asyncio.run(run_scenario(*all_scenarios[name], args.requests, args.concurrency))
+                results[name] = result
+                print(f"{name:<22} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']} ms  "
+                      f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors']}")
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=10)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: getattr(args, key) for key in ("concurrency", "requests", "latency", "tokens_per_second", "tokens", "env")},
+        "scenarios": results,
+    }
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\n💾 Baseline saved to {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if baseline.get("config") != report["config"]:
+            print("⚠️  Baseline was recorded with different settings; comparison may not be meaningful")
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            print(f"\n❌ Regressions: {', '.join(regressed)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
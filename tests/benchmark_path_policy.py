@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Path Policy Micro-benchmark
+Times allow/deny decisions per path, old checks against ai_core.path_policy
+
+Builds a temporary tree of --files files and checks every path with the
+checks the file endpoints used before (Path.resolve() plus a startswith scan
+or relative_to) and with PathPolicy: a cold check (realpath and regex), a
+cached check, and decide() on an already resolved path. Exits with status 1
+if a cached check averages more than --max-hit-ns.
+
+    python tests/benchmark_path_policy.py --files 5000 --allow-rules 20 --deny-rules 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.path_policy import PathPolicy
+
+
+def print_header(title):
+    """Print formatted header"""
+    print(f"\n{'⏱️  ' + title:=^80}")
+
+
+def make_tree(root, files):
+    """files paths spread over nested directories; returns them"""
+    paths = []
+    for i in range(files):
+        directory = root / f"pkg{i % 20}" / f"mod{i % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"file{i}.py"
+        path.touch()
+        paths.append(str(path))
+    return paths
+
+
+def time_per_call(check, paths, rounds):
+    """Average nanoseconds per call over rounds passes of paths"""
+    started = time.perf_counter_ns()
+    for _ in range(rounds):
+        for path in paths:
+            check(path)
+    return (time.perf_counter_ns() - started) / (rounds * len(paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark path access checks")
+    parser.add_argument("--files", type=int, default=5000, help="Paths to check")
+    parser.add_argument("--allow-rules", type=int, default=10, help="Allowed directories (one real, the rest decoys)")
+    parser.add_argument("--deny-rules", type=int, default=5, help="Deny globs")
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the paths for the cached checks")
+    parser.add_argument("--max-hit-ns", type=float, default=1000.0, help="Fail if a cached check is slower")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ai-policy-") as tmp:
+        root = Path(tmp).resolve()
+        paths = make_tree(root, args.files)
+        allowed = [f"/nonexistent/decoy{i}" for i in range(args.allow_rules - 1)] + [str(root)]
+        deny = [f"*.secret{i}" for i in range(args.deny_rules - 1)] + [".git/**"]
+
+        def startswith_check(path):
+            abs_path = Path(path).resolve()
+            return any(str(abs_path).startswith(allowed_dir) for allowed_dir in allowed)
+
+        def relative_to_check(path):
+            try:
+                Path(path).resolve().relative_to(root)
+                return True
+            except ValueError:
+                return False
+
+        policy = PathPolicy(allowed, deny=deny, cache_size=args.files * 2)
+        cold = PathPolicy(allowed, deny=deny, cache_size=args.files * 2, ttl=0)
+        real_paths = [os.path.realpath(path) for path in paths]
+        policy.filter(paths)    # Warm the cache
+
+        results = {
+            "resolve() + startswith scan (old)": time_per_call(startswith_check, paths, 1),
+            "resolve() + relative_to (old)": time_per_call(relative_to_check, paths, 1),
+            "PathPolicy, uncached": time_per_call(cold.is_allowed, paths, 1),
+            "PathPolicy, cached": time_per_call(policy.is_allowed, paths, args.rounds),
+            "PathPolicy.decide() on a real path": time_per_call(policy.decide, real_paths, args.rounds),
+        }
+        assert all(policy.is_allowed(path) for path in paths), "policy denied an allowed path"
+
+    print_header(f"PATH CHECKS ({args.files} paths, {args.allow_rules} allow rules, {args.deny_rules} deny rules)")
+    baseline = results["resolve() + startswith scan (old)"]
+    for name, ns in results.items():
+        print(f"{name:<38} {ns:>10.0f} ns/check   {baseline / ns:>7.1f}x")
+
+    hit_ns = results["PathPolicy, cached"]
+    if hit_ns > args.max_hit_ns:
+        print(f"\n❌ Cached checks average {hit_ns:.0f} ns, over the {args.max_hit_ns:.0f} ns budget")
+        sys.exit(1)
+    print(f"\n✅ Cached checks average {hit_ns:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
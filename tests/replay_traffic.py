@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Traffic Replay
+Re-issue captured requests against a server and compare latencies
+
+Reads one or more captures written by CaptureMiddleware (AI_CAPTURE_PATH)
+and sends the requests to --target, keeping their original spacing
+divided by --speed (1 = real time, 10 = ten times faster, 0 = as fast as
+--concurrency allows). Reports recorded and replayed p50/p95/p99 per
+endpoint, the latency deltas, and any requests whose status changed.
+
+    python tests/replay_traffic.py capture.jsonl.gz --target http://localhost:8000 --speed 5
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.traffic_capture import read_capture
+
+
+def print_header(title):
+    """Print formatted header"""
+    print(f"\n{'🔁 ' + title:=^80}")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def request_args(record):
+    """httpx.request() arguments that reproduce a captured request"""
+    args = {"headers": record.get("headers") or {}}
+    if record.get("query"):
+        args["params"] = httpx.QueryParams(record["query"])
+    body = record.get("body")
+    if isinstance(body, (dict, list)):
+        args["json"] = body
+    elif body is not None:
+        args["content"] = body.encode("utf-8")
+    return args
+
+
+async def replay(records, target, speed, concurrency, timeout):
+    """Send every record; returns a list of (record, status, latency_ms)"""
+    results = []
+    limit = asyncio.Semaphore(concurrency)
+    first_ts = records[0]["ts"]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=timeout) as client:
+        async def send(record):
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(record["method"], record["path"], **request_args(record))
+                    await response.aread()
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = None
+                results.append((record, status, (time.perf_counter() - started) * 1000))
+
+        tasks = []
+        started = time.perf_counter()
+        for record in records:
+            if speed > 0:
+                # Keep the recorded arrival pattern, compressed by speed
+                delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(record)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def report(results, wall_seconds):
+    """Print per-endpoint latency comparisons; returns the summary as a dict"""
+    by_endpoint = defaultdict(lambda: {"recorded": [], "replayed": [], "errors": 0, "status_changed": 0})
+    for record, status, latency_ms in results:
+        entry = by_endpoint[f"{record['method']} {record['path']}"]
+        entry["recorded"].append(record["latency_ms"])
+        if status is None or status >= 500:
+            entry["errors"] += 1
+        else:
+            entry["replayed"].append(latency_ms)
+        if status != record.get("status"):
+            entry["status_changed"] += 1
+
+    summary = {}
+    print_header(f"REPLAYED {len(results)} REQUESTS IN {wall_seconds:.1f}s")
+    for endpoint, entry in sorted(by_endpoint.items()):
+        recorded, replayed = sorted(entry["recorded"]), sorted(entry["replayed"])
+        row = {"count": len(recorded), "errors": entry["errors"], "status_changed": entry["status_changed"]}
+        print(f"\n{endpoint}  ({len(recorded)} requests, {entry['errors']} errors, "
+              f"{entry['status_changed']} status changes)")
+        for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            before, after = percentile(recorded, fraction), percentile(replayed, fraction)
+            delta = after - before if before is not None and after is not None else None
+            row[name] = {"recorded_ms": before, "replayed_ms": after,
+                         "delta_ms": round(delta, 2) if delta is not None else None}
+            if delta is None:
+                print(f"   {name}: recorded {before} ms, replayed {after} ms")
+                continue
+            change = f" ({delta / before:+.0%})" if before else ""
+            print(f"   {name}: {before:9.1f} ms -> {after:9.1f} ms   {delta:+9.1f} ms{change}")
+        summary[endpoint] = row
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a server")
+    parser.add_argument("captures", nargs="+", help="Capture files (gzip JSONL)")
+    parser.add_argument("--target", default="http://localhost:8000", help="Base URL to send requests to")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = real time, N = N times faster, 0 = max speed")
+    parser.add_argument("--concurrency", type=int, default=64, help="Most requests in flight at once")
+    parser.add_argument("--path", action="append", help="Only replay these paths (repeatable)")
+    parser.add_argument("--limit", type=int, help="Replay at most this many requests")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", metavar="PATH", help="Also write the summary as JSON")
+    args = parser.parse_args()
+
+    records = [record for path in args.captures for record in read_capture(path)]
+    if args.path:
+        records = [record for record in records if record["path"] in args.path]
+    # Bodies over the capture limit were not stored and cannot be replayed faithfully
+    records = [record for record in records if record.get("body") is not None or not record.get("body_bytes")]
+    records.sort(key=lambda record: record["ts"])
+    records = records[:args.limit] if args.limit else records
+    if not records:
+        print("❌ No requests to replay")
+        sys.exit(1)
+
+    span = records[-1]["ts"] - records[0]["ts"]
+    mode = "max speed" if args.speed <= 0 else f"{args.speed:g}x ({span / args.speed:.1f}s)"
+    print(f"🔁 Replaying {len(records)} requests recorded over {span:.1f}s at {mode} against {args.target}")
+
+    started = time.perf_counter()
+    results = asyncio.run(replay(records, args.target, args.speed, args.concurrency, args.timeout))
+    summary = report(results, time.perf_counter() - started)
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"\n💾 Summary saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
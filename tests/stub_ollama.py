@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Stub Ollama Server
+A deterministic stand-in for Ollama, for benchmarks and offline testing
+
+Serves /api/generate (streaming and not), /api/tags, /api/ps and
+/api/embed. Answers are derived from a hash of the prompt, so the same
+prompt always gets the same answer, and timing follows the configured
+prompt latency and tokens/sec so services can be load tested without a GPU.
+
+    python tests/stub_ollama.py --port 11555 --latency 0.05 --tokens-per-second 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import uvicorn
+
+WORDS = ["the", "model", "answer", "is", "local", "fast", "data", "file", "token", "cache",
+         "request", "server", "python", "result", "value", "simple"]
+
+# Overridden from the command line
+settings = {
+    "latency": 0.05,            # Seconds of prompt evaluation before the first token
+    "tokens_per_second": 200.0,
+    "tokens": 32,               # Tokens per answer
+    "models": ["llama3.2:latest", "llama3:latest", "nomic-embed-text:latest"],
+    "embedding_size": 64,
+}
+
+app = FastAPI(title="Stub Ollama")
+
+
+def answer_tokens(prompt: str) -> list:
+    """The same prompt always produces the same answer"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return [WORDS[digest[i % len(digest)] % len(WORDS)] + " " for i in range(settings["tokens"])]
+
+
+def timing_fields(prompt: str, eval_count: int, started: float) -> dict:
+    eval_seconds = eval_count / settings["tokens_per_second"]
+    return {
+        "total_duration": int((time.perf_counter() - started) * 1e9),
+        "load_duration": 0,
+        "prompt_eval_count": max(len(prompt.split()), 1),
+        "prompt_eval_duration": int(settings["latency"] * 1e9),
+        "eval_count": eval_count,
+        "eval_duration": int(eval_seconds * 1e9),
+        "context": list(range(eval_count)),
+    }
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    model, prompt = body.get("model", ""), body.get("prompt", "")
+    started = time.perf_counter()
+    # An empty prompt only loads the model, as in Ollama
+    tokens = answer_tokens(prompt) if prompt else []
+    per_token = 1 / settings["tokens_per_second"]
+
+    if body.get("stream", True):
+        async def chunks():
+            await asyncio.sleep(settings["latency"])
+            for token in tokens:
+                await asyncio.sleep(per_token)
+                yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+            final = {"model": model, "response": "", "done": True}
+            final.update(timing_fields(prompt, len(tokens), started))
+            yield json.dumps(final) + "\n"
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    await asyncio.sleep(settings["latency"] + per_token * len(tokens))
+    result = {"model": model, "response": "".join(tokens).strip(), "done": True}
+    result.update(timing_fields(prompt, len(tokens), started))
+    return result
+
+
+@app.get("/api/tags")
+async def tags():
+    return {"models": [{"name": name, "size": 2_000_000_000} for name in settings["models"]]}
+
+
+@app.get("/api/ps")
+async def ps():
+    return {"models": [{"name": name} for name in settings["models"]]}
+
+
+@app.post("/api/embed")
+async def embed(request: Request):
+    body = await request.json()
+    inputs = body.get("input", "")
+    inputs = [inputs] if isinstance(inputs, str) else inputs
+
+    def vector(text: str) -> list:
+        # Bag of hashed words, so paraphrases sharing words come out similar
+        values = [0.0] * settings["embedding_size"]
+        for word in text.lower().split():
+            values[int(hashlib.md5(word.encode()).hexdigest(), 16) % len(values)] += 1.0
+        return values
+
+    return {"model": body.get("model"), "embeddings": [vector(text) for text in inputs]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic stub Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11555)
+    parser.add_argument("--latency", type=float, default=settings["latency"], help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=settings["tokens_per_second"])
+    parser.add_argument("--tokens", type=int, default=settings["tokens"], help="Tokens per answer")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, tokens_per_second=args.tokens_per_second, tokens=args.tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Backend Pool Tests
+Failover across Ollama backends, with each backend's HTTP traffic faked
+
+Run with: python -m pytest tests/test_backend_pool.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.backend_pool import BackendPool
+from ai_core.ollama_client import OllamaError
+
+
+def make_pool(behaviours):
+    """A pool of len(behaviours) backends; each behaviour is "ok", "refuse" or "timeout"
+
+    Returns the pool and a list recording which backend served each request.
+    """
+    calls = []
+    pool = BackendPool([f"http://backend{i}" for i in range(len(behaviours))], retries=0)
+    for i, (backend, behaviour) in enumerate(zip(pool.backends, behaviours)):
+        def handler(request, i=i, behaviour=behaviour):
+            calls.append(i)
+            if behaviour == "refuse":
+                raise httpx.ConnectError("Connection refused", request=request)
+            if behaviour == "timeout":
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(200, json={"model": "m", "response": f"from {i}", "done": True})
+        backend.client._client = httpx.AsyncClient(base_url=backend.url,
+                                                   transport=httpx.MockTransport(handler))
+    return pool, calls
+
+
+def test_connect_error_fails_over_and_ejects():
+    pool, calls = make_pool(["refuse", "ok"])
+    result = asyncio.run(pool.generate("m", "hi"))
+    assert result["response"] == "from 1"
+    assert calls == [0, 1]
+    assert not pool.backends[0].healthy
+    assert pool.backends[1].healthy
+
+
+def test_timeout_does_not_fail_over_or_eject():
+    pool, calls = make_pool(["timeout", "ok"])
+    with pytest.raises(OllamaError, match="timed out") as error:
+        asyncio.run(pool.generate("m", "hi"))
+    assert not error.value.connect_failed
+    # The prompt ran once, and the slow backend is still considered healthy
+    assert calls == [0]
+    assert all(backend.healthy for backend in pool.backends)
+
+
+def test_all_refusing_raises_the_last_connect_error():
+    pool, calls = make_pool(["refuse", "refuse"])
+    with pytest.raises(OllamaError, match="Cannot connect") as error:
+        asyncio.run(pool.generate("m", "hi"))
+    assert error.value.connect_failed
+    assert sorted(calls) == [0, 1]
+
+
+def test_stream_timeout_does_not_fail_over():
+    pool, calls = make_pool(["timeout", "ok"])
+
+    async def consume():
+        return [chunk async for chunk in pool.stream_generate("m", "hi")]
+
+    with pytest.raises(OllamaError):
+        asyncio.run(consume())
+    assert calls == [0]
+    assert pool.backends[0].healthy
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Path Policy Tests
+Allow/deny decisions on real paths, symlink escapes and the decision cache
+
+Run with: python -m pytest tests/test_path_policy.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.path_policy import PathPolicy
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """allowed/ with a few files, and outside/ next to it"""
+    root = Path(os.path.realpath(tmp_path))
+    allowed, outside = root / "allowed", root / "outside"
+    for path in ("notes.txt", ".env", "keys/server.pem", ".git/config",
+                 "node_modules/pkg/index.js", "src/app.py"):
+        (allowed / path).parent.mkdir(parents=True, exist_ok=True)
+        (allowed / path).write_text("x")
+    outside.mkdir()
+    (outside / "secret.txt").write_text("x")
+    return allowed, outside
+
+
+def test_allowed_directory_and_outside(tree):
+    allowed, outside = tree
+    policy = PathPolicy([str(allowed)])
+    assert policy.is_allowed(str(allowed / "notes.txt"))
+    assert policy.is_allowed(str(allowed / "src" / "app.py"))
+    assert not policy.is_allowed(str(outside / "secret.txt"))
+    # ".." is resolved before deciding
+    assert not policy.is_allowed(str(allowed / ".." / "outside" / "secret.txt"))
+
+
+@pytest.mark.parametrize("deny, denied", [
+    (".env", ".env"),
+    ("*.pem", "keys/server.pem"),
+    ("keys/*.pem", "keys/server.pem"),
+    (".git/**", ".git/config"),
+    ("node_modules/**", "node_modules/pkg/index.js"),
+])
+def test_denied_globs(tree, deny, denied):
+    allowed, _ = tree
+    policy = PathPolicy([str(allowed)], deny=[deny])
+    assert not policy.is_allowed(str(allowed / denied))
+    assert policy.is_allowed(str(allowed / "notes.txt"))
+    assert policy.is_allowed(str(allowed / "src" / "app.py"))
+
+
+def test_denied_absolute_directory(tree):
+    allowed, _ = tree
+    policy = PathPolicy([str(allowed)], deny=[str(allowed / "src")])
+    assert not policy.is_allowed(str(allowed / "src" / "app.py"))
+    assert not policy.is_allowed(str(allowed / "src"))
+    assert policy.is_allowed(str(allowed / "notes.txt"))
+
+
+def test_symlink_escape_is_denied(tree):
+    allowed, outside = tree
+    (allowed / "link.txt").symlink_to(outside / "secret.txt")
+    (allowed / "linkdir").symlink_to(outside)
+    policy = PathPolicy([str(allowed)])
+    assert not policy.is_allowed(str(allowed / "link.txt"))
+    assert not policy.is_allowed(str(allowed / "linkdir" / "secret.txt"))
+
+
+def test_symlink_to_denied_file_is_denied(tree):
+    allowed, _ = tree
+    (allowed / "innocent.txt").symlink_to(allowed / ".env")
+    policy = PathPolicy([str(allowed)], deny=[".env"])
+    assert not policy.is_allowed(str(allowed / "innocent.txt"))
+    assert policy.resolve(str(allowed / "notes.txt")) == str(allowed / "notes.txt")
+
+
+def test_cached_decision_lasts_until_ttl(tree):
+    allowed, outside = tree
+    link = allowed / "link.txt"
+    link.symlink_to(allowed / "notes.txt")
+    policy = PathPolicy([str(allowed)], ttl=3600)
+    assert policy.is_allowed(str(link))
+    # Swap the link to point outside: the cached decision still stands...
+    link.unlink()
+    link.symlink_to(outside / "secret.txt")
+    assert policy.is_allowed(str(link))
+    assert policy.stats()["hits"] == 1
+    # ...until the directory is invalidated
+    policy.invalidate(str(allowed))
+    assert not policy.is_allowed(str(link))
+
+
+def test_expired_decision_is_resolved_again(tree):
+    allowed, outside = tree
+    link = allowed / "link.txt"
+    link.symlink_to(allowed / "notes.txt")
+    policy = PathPolicy([str(allowed)], ttl=0)
+    assert policy.is_allowed(str(link))
+    link.unlink()
+    link.symlink_to(outside / "secret.txt")
+    assert not policy.is_allowed(str(link))
+    assert policy.stats()["hits"] == 0 and policy.stats()["misses"] == 2
+
+
+def test_cache_is_bounded(tree):
+    allowed, _ = tree
+    policy = PathPolicy([str(allowed)], cache_size=2)
+    for name in ("a", "b", "c", "d"):
+        policy.is_allowed(str(allowed / name))
+    assert policy.stats()["entries"] == 2
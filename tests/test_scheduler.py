@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Scheduler Tests
+Priority order and queue limits of the per-model request scheduler
+
+Run with: python -m pytest tests/test_scheduler.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, ModelScheduler, SchedulerBusy
+
+
+def test_interactive_admitted_before_earlier_batch():
+    async def scenario():
+        scheduler = ModelScheduler(default_concurrency=1)
+        order = []
+        held = await scheduler.acquire("m")
+
+        async def request(name, priority):
+            async with scheduler.slot("m", priority):
+                order.append(name)
+
+        tasks = [asyncio.create_task(request("batch1", PRIORITY_BATCH)),
+                 asyncio.create_task(request("batch2", PRIORITY_BATCH))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("interactive", PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["m"]["queued"] == 3
+        held.release()
+        await asyncio.gather(*tasks)
+        return order, scheduler.stats()["m"]
+
+    order, stats = asyncio.run(scenario())
+    # Interactive jumps the queue; batch requests keep their arrival order
+    assert order == ["interactive", "batch1", "batch2"]
+    assert stats["running"] == 0 and stats["queued"] == 0 and stats["admitted"] == 4
+
+
+def test_full_queue_rejects_with_429():
+    async def scenario():
+        scheduler = ModelScheduler(default_concurrency=1, max_queue=1)
+        held = await scheduler.acquire("m")
+        waiting = asyncio.create_task(scheduler.acquire("m"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy) as busy:
+            await scheduler.acquire("m")
+        held.release()
+        (await waiting).release()
+        return busy.value, scheduler.stats()["m"]
+
+    busy, stats = asyncio.run(scenario())
+    assert busy.status_code == 429
+    assert int(busy.headers["Retry-After"]) >= 1
+    assert stats["rejected"] == 1 and stats["running"] == 0
+
+
+def test_queue_timeout_raises_503_and_frees_the_place():
+    async def scenario():
+        scheduler = ModelScheduler(default_concurrency=1, max_queue=1, queue_timeout=0.05)
+        held = await scheduler.acquire("m")
+        with pytest.raises(SchedulerBusy) as busy:
+            await scheduler.acquire("m")
+        # The timed-out waiter no longer counts against the queue limit
+        waiting = asyncio.create_task(scheduler.acquire("m"))
+        await asyncio.sleep(0)
+        held.release()
+        (await waiting).release()
+        return busy.value, scheduler.stats()["m"]
+
+    busy, stats = asyncio.run(scenario())
+    assert busy.status_code == 503
+    assert stats["timed_out"] == 1 and stats["queued"] == 0 and stats["running"] == 0
+
+
+def test_limits_are_per_model():
+    async def scenario():
+        scheduler = ModelScheduler(default_concurrency=1, model_limits={"big": 2})
+        slots = [await scheduler.acquire("big"), await scheduler.acquire("big"),
+                 await scheduler.acquire("small")]
+        stats = scheduler.stats()
+        for slot in slots:
+            slot.release()
+            slot.release()    # Releasing twice must not free a second slot
+        return stats, scheduler.stats()
+
+    held, released = asyncio.run(scenario())
+    assert held["big"]["running"] == 2 and held["small"]["running"] == 1
+    assert released["big"]["running"] == 0 and released["small"]["running"] == 0
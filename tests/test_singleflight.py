@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Tests
+Sharing one upstream call between concurrent identical requests, and
+cancelling it only once every caller has gone
+
+Run with: python -m pytest tests/test_singleflight.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the shared ai_core modules importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ai_core.singleflight import SingleFlight
+
+
+class Upstream:
+    """A fake generation that runs until released, counting calls and cancellations"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"response": "shared"}
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await asyncio.gather(*callers), upstream, flight.stats()
+
+    results, upstream, stats = asyncio.run(scenario())
+    assert results == [{"response": "shared"}] * 3
+    assert upstream.calls == 1
+    assert stats["upstream_calls"] == 1 and stats["collapsed_calls"] == 2 and stats["in_flight"] == 0
+
+
+def test_cancelling_one_of_several_callers_keeps_the_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        first = asyncio.create_task(flight.do("k", upstream))
+        second = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await second, first.cancelled(), upstream, flight.stats()
+
+    result, first_cancelled, upstream, stats = asyncio.run(scenario())
+    assert result == {"response": "shared"}
+    assert first_cancelled
+    assert upstream.cancelled == 0 and stats["abandoned_calls"] == 0
+
+
+def test_cancelling_the_last_caller_cancels_the_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)    # Let the cancellation reach the upstream call
+        # A new request after everyone gave up starts a fresh call
+        upstream.release.set()
+        again = await flight.do("k", upstream)
+        return again, upstream, flight.stats()
+
+    again, upstream, stats = asyncio.run(scenario())
+    assert upstream.cancelled == 1
+    assert stats["abandoned_calls"] == 1
+    assert again == {"response": "shared"} and upstream.calls == 2
+
+
+def test_timeout_of_the_last_caller_cancels_the_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("k", upstream, timeout=0.01)
+        await asyncio.sleep(0)
+        return upstream, flight.stats()
+
+    upstream, stats = asyncio.run(scenario())
+    assert upstream.cancelled == 1
+    assert stats["abandoned_calls"] == 1 and stats["in_flight"] == 0